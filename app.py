@@ -1,27 +1,103 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+import json
 import os
 import sys
+import time
 # Add these imports at the top of app.py (around line 6-8)
 from book_recommendation_engine import BookRecommendationEngine
-from utils.book_api import GoogleBooksAPI
+from utils.cover_cache import CoverCache
+from utils.http_cache import compress_response, snapshot_response
+from utils.library_store import LibraryStore
+from utils.metrics import ERRORS, HTTP_REQUEST_SECONDS, REGISTRY, cache_collector, single_flight_collector
+from utils.listing import list_page, parse_list_params
+from utils.snapshots import DegradedSnapshotError, SnapshotRefresher
+from utils.tracing import Trace, deactivate, default_sink, span
 
 # Import your existing recommendation classes/functions
 # Assuming you have these from your previous work:
 # from your_recommendation_module import YourRecommendationClass
 # from your_book_api_module import YourBookAPIClass
 
+class TracedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        """Serialize to JSON, recorded as a span of the active trace"""
+        with span('serialize'):
+            return super().dumps(obj, **kwargs)
+
 app = Flask(__name__)
+app.json = TracedJSONProvider(app)
 CORS(app)  # Enable CORS for API calls
 
+# Routes traced end to end; finished traces are appended to the sink configured by BOOKAI_TRACE_LOG
+TRACED_ENDPOINTS = {'get_recommendations'}
+trace_sink = default_sink()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Observe handling time; for streamed responses this covers the time to the first byte"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                     method=request.method, status=response.status_code)
+    return response
+
+app.after_request(compress_response)
+
+@app.before_request
+def start_trace():
+    if request.endpoint in TRACED_ENDPOINTS:
+        g.trace = Trace(request.url_rule.rule, request.headers.get('X-Trace-Id'))
+        g.trace_token = g.trace.activate()
+
+@app.after_request
+def attach_trace(response):
+    """Return the trace ID, and add the stage timeline to JSON bodies when X-Debug-Trace asks for it"""
+    trace = g.get('trace')
+    if trace is None:
+        return response
+    
+    response.headers['X-Trace-Id'] = trace.trace_id
+    if (request.headers.get('X-Debug-Trace', '').lower() in ('1', 'true', 'yes')
+            and response.is_json and not response.is_streamed):
+        body = response.get_json()
+        if isinstance(body, dict):
+            body['trace'] = trace.timeline()
+            response.set_data(json.dumps(body))
+    return response
+
+@app.teardown_request
+def finish_trace(exc):
+    trace = g.pop('trace', None)
+    if trace is None:
+        return
+    
+    deactivate(g.pop('trace_token'))
+    trace.finish()
+    if trace_sink is not None:
+        try:
+            trace_sink.write(trace)
+        except OSError as e:
+            print(f"Could not write trace {trace.trace_id}: {e}")
+
 # Initialize your recommendation system
 # recommendation_system = YourRecommendationClass()
 # book_api = YourBookAPIClass()
 
 # Add these lines after 'CORS(app)' and before '@app.route('/')'
 # Initialize your recommendation system
-recommendation_engine = BookRecommendationEngine()
-book_api = GoogleBooksAPI()
+recommendation_engine = BookRecommendationEngine(library=LibraryStore())
+# Share the engine's client so all routes use one cache and single-flight group
+book_api = recommendation_engine.books_api
+cover_cache = CoverCache(book_api)
+# Download covers for snapshot books while building them, so first page views hit the disk cache
+PREFETCH_COVERS = os.getenv('BOOKAI_PREFETCH_COVERS', '1').lower() in ('1', 'true', 'yes')
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -42,40 +118,72 @@ def top_rated():
     """Serve the top-rated books page"""
     return render_template('top-rated.html')
 
+def parse_user_preferences(data, user_id=None):
+    """
+    Build a user preferences object from the frontend's request body
+    
+    When user_id is given, empty fields are filled in from the user's saved library.
+    
+    Returns:
+        dict: User preferences, or None if no preference was provided
+    """
+    # Extract user preferences
+    favorite_books = data.get('favoriteBooks', '')
+    favorite_authors = data.get('favoriteAuthors', '')
+    genres = data.get('genres', [])
+    additional_preferences = data.get('additionalPreferences', '')
+    
+    # Create user preferences object
+    user_preferences = {
+        'favorite_books': favorite_books.split('\n') if favorite_books else [],
+        'favorite_authors': favorite_authors.split('\n') if favorite_authors else [],
+        'genres': genres,
+        'additional_preferences': additional_preferences
+    }
+    if user_id:
+        user_preferences = recommendation_engine.personalize_preferences(user_preferences, user_id)
+    
+    # Validate input
+    if not any(user_preferences.get(field) for field in ('favorite_books', 'favorite_authors', 'genres')):
+        return None
+    
+    return user_preferences
+
 @app.route('/api/recommendations', methods=['POST'])
 def get_recommendations():
     """Handle recommendation requests"""
     try:
         # Get data from the frontend
-        data = request.json
+        user_preferences = parse_user_preferences(request.json, library_user_id())
         
-        # Extract user preferences
-        favorite_books = data.get('favoriteBooks', '')
-        favorite_authors = data.get('favoriteAuthors', '')
-        genres = data.get('genres', [])
-        additional_preferences = data.get('additionalPreferences', '')
-        
-        # Validate input
-        if not favorite_books and not favorite_authors and not genres:
+        if user_preferences is None:
             return jsonify({'error': 'Please provide at least one preference'}), 400
         
-        # Create user preferences object
-        user_preferences = {
-            'favorite_books': favorite_books.split('\n') if favorite_books else [],
-            'favorite_authors': favorite_authors.split('\n') if favorite_authors else [],
-            'genres': genres,
-            'additional_preferences': additional_preferences
-        }
+        # Optional over-generate-and-rerank mode
+        try:
+            top_k = max(1, min(int(request.json.get('topK', 5)), 20))
+            pool_size = request.json.get('poolSize')
+            pool_size = max(top_k, min(int(pool_size), 40)) if pool_size else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'topK and poolSize must be integers'}), 400
+        
+        try:
+            limit, offset, fields = parse_list_params(request.args)
+        except ValueError:
+            return jsonify({'error': 'limit must be a positive integer and offset a non-negative integer'}), 400
         
         # Get recommendations using the recommendation engine
-        result = recommendation_engine.get_recommendations(user_preferences)
+        result = recommendation_engine.get_recommendations(user_preferences, top_k=top_k, pool_size=pool_size)
         
         # Return the complete result or just the recommendations
         if result.get('success', False):
+            page = list_page(result['recommendations'], limit, offset, fields)
             return jsonify({
                 'success': True,
-                'recommendations': result['recommendations'],
+                'recommendations': page['books'],
                 'total_found': result.get('total_found', 0),
+                'offset': page['offset'],
+                'next_offset': page['next_offset'],
                 'user_preferences': result.get('user_preferences', {})
             })
         else:
@@ -85,11 +193,74 @@ def get_recommendations():
             }), 500
         
     except Exception as e:
-        # Log error but don't print to terminal
+        # Count the error rather than printing it
+        ERRORS.inc(component='api')
         return jsonify({
             'error': 'Something went wrong while generating recommendations. Please try again.',
             'recommendations': []
         }), 500
+
+@app.route('/api/recommendations/stream', methods=['POST'])
+def stream_recommendations():
+    """Stream recommendations as Server-Sent Events, one event per enriched book"""
+    user_preferences = parse_user_preferences(request.json or {}, library_user_id())
+    
+    if user_preferences is None:
+        return jsonify({'error': 'Please provide at least one preference'}), 400
+    
+    def generate():
+        try:
+            for event, payload in recommendation_engine.iter_recommendations(user_preferences):
+                yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        except Exception:
+            ERRORS.inc(component='api')
+            error = {'error': 'Something went wrong while generating recommendations. Please try again.'}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop reverse proxies from buffering the stream
+    })
+
+# Upper bound on users accepted by one batch request
+MAX_BATCH_USERS = 500
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+def batch_recommendations():
+    """
+    Recommendations for many users at once, streamed back as NDJSON
+    
+    Expects {"users": [{"userId": ..., "genres": [...], "favoriteBooks": ..., ...}, ...]}
+    and emits one JSON line per user, in completion order.
+    """
+    users = (request.json or {}).get('users') or []
+    
+    if not isinstance(users, list) or not users:
+        return jsonify({'error': 'Please provide a non-empty "users" list'}), 400
+    if len(users) > MAX_BATCH_USERS:
+        return jsonify({'error': f'At most {MAX_BATCH_USERS} users per batch'}), 400
+    
+    user_ids = []
+    preferences_list = []
+    for position, user in enumerate(users):
+        user_preferences = parse_user_preferences(user) if isinstance(user, dict) else None
+        if user_preferences is None:
+            return jsonify({'error': f'User at position {position} has no preferences'}), 400
+        user_ids.append(user.get('userId', position))
+        preferences_list.append(user_preferences)
+    
+    def generate():
+        for index, result in recommendation_engine.get_recommendations_batch(preferences_list):
+            yield json.dumps({
+                'user_id': user_ids[index],
+                'success': result.get('success', False),
+                'recommendations': result.get('recommendations', []),
+                'total_found': result.get('total_found', 0),
+                'error': result.get('error')
+            }) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 def get_book_recommendations(user_preferences):
     """
     Get book recommendations using your existing AI + Google Books API integration
@@ -107,66 +278,236 @@ def get_book_recommendations(user_preferences):
         # Return empty list if something goes wrong
         return []
 
+def check_snapshot_books(books, titles, fallback_titles):
+    """
+    Reject a list built while an upstream was failing, so it can't replace a good snapshot
+
+    Raises:
+        RuntimeError: Nothing was built
+        DegradedSnapshotError: Gemini fell back to the static titles, or most books are
+            placeholders because Google Books lookups failed
+    """
+    if not books:
+        raise RuntimeError('no books were built')
+    if titles == fallback_titles:
+        raise DegradedSnapshotError('Gemini unavailable, built from the static fallback titles', books)
+    placeholders = sum(1 for book in books if book.get('placeholder'))
+    if placeholders * 2 > len(books):
+        raise DegradedSnapshotError(f"{placeholders} of {len(books)} books are placeholders", books)
+
+def build_trending_books():
+    """Build the trending list using AI + Google Books API"""
+    # Get trending book titles from AI
+    trending_titles = recommendation_engine.ai_recommender.get_trending_books()
+    
+    # Enrich with detailed information from Google Books API
+    detailed_books = book_api.get_multiple_books(trending_titles)
+    
+    # Add trending indicators to the books
+    for rank, book in enumerate(detailed_books, 1):
+        book['is_trending'] = True
+        book['trending_rank'] = rank
+    
+    check_snapshot_books(detailed_books, trending_titles,
+                         recommendation_engine.ai_recommender._get_fallback_trending_books(len(trending_titles)))
+    
+    if PREFETCH_COVERS:
+        cover_cache.prefetch(detailed_books)
+    
+    return detailed_books
+
+def build_top_rated_books():
+    """Build the top-rated list using AI + Google Books API"""
+    # Get top-rated book titles from AI
+    top_rated_titles = recommendation_engine.ai_recommender.get_top_rated_books()
+    
+    # Enrich with detailed information from Google Books API
+    detailed_books = book_api.get_multiple_books(top_rated_titles)
+    
+    # Add top-rated indicators to the books
+    for rank, book in enumerate(detailed_books, 1):
+        book['is_top_rated'] = True
+        book['top_rated_rank'] = rank
+    
+    check_snapshot_books(detailed_books, top_rated_titles,
+                         recommendation_engine.ai_recommender._get_fallback_top_rated_books(len(top_rated_titles)))
+    
+    if PREFETCH_COVERS:
+        cover_cache.prefetch(detailed_books)
+    
+    return detailed_books
+
+# Rebuild the trending and top-rated lists in the background so page views never wait on upstreams
+SNAPSHOT_INTERVAL = int(os.getenv('BOOKAI_SNAPSHOT_INTERVAL', '1800'))
+trending_snapshots = SnapshotRefresher('trending', build_trending_books, interval=SNAPSHOT_INTERVAL).start()
+top_rated_snapshots = SnapshotRefresher('top-rated', build_top_rated_books, interval=SNAPSHOT_INTERVAL).start()
+
 @app.route('/api/trending', methods=['GET'])
 def get_trending_books():
-    """Get trending books with detailed information using AI + Google Books API"""
+    """Serve the latest trending snapshot; supports ?limit=, ?offset= and ?fields="""
     try:
-        # Get trending book titles from AI
-        trending_titles = recommendation_engine.ai_recommender.get_trending_books()
-        
-        # Enrich with detailed information from Google Books API
-        detailed_books = book_api.get_multiple_books(trending_titles)
-        
-        # Add trending indicators to the books
-        for book in detailed_books:
-            book['is_trending'] = True
-            book['trending_rank'] = detailed_books.index(book) + 1
-        
-        return jsonify({
-            'success': True,
-            'books': detailed_books,
-            'total_found': len(detailed_books)
-        })
-
-    except Exception as e:
+        limit, offset, fields = parse_list_params(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be a positive integer and offset a non-negative integer', 'books': []}), 400
+    
+    snapshot = trending_snapshots.get()
+    
+    if snapshot is None:
         return jsonify({
             'success': False,
-            'error': f'Failed to fetch trending books: {str(e)}',
+            'error': f'Failed to fetch trending books: {trending_snapshots.last_error}',
             'books': []
         }), 500
+    
+    return snapshot_response({
+        'success': True,
+        **list_page(snapshot.data, limit, offset, fields)
+    }, snapshot, stale_while_revalidate=SNAPSHOT_INTERVAL)
 
 @app.route('/api/top-rated', methods=['GET'])
 def get_top_rated_books():
-    """Get top-rated books with detailed information using AI + Google Books API"""
+    """Serve the latest top-rated snapshot; supports ?limit=, ?offset= and ?fields="""
     try:
-        # Get top-rated book titles from AI
-        top_rated_titles = recommendation_engine.ai_recommender.get_top_rated_books()
-        
-        # Enrich with detailed information from Google Books API
-        detailed_books = book_api.get_multiple_books(top_rated_titles)
-        
-        # Add top-rated indicators to the books
-        for book in detailed_books:
-            book['is_top_rated'] = True
-            book['top_rated_rank'] = detailed_books.index(book) + 1
-        
-        return jsonify({
-            'success': True,
-            'books': detailed_books,
-            'total_found': len(detailed_books)
-        })
-
-    except Exception as e:
+        limit, offset, fields = parse_list_params(request.args)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be a positive integer and offset a non-negative integer', 'books': []}), 400
+    
+    snapshot = top_rated_snapshots.get()
+    
+    if snapshot is None:
         return jsonify({
             'success': False,
-            'error': f'Failed to fetch top-rated books: {str(e)}',
+            'error': f'Failed to fetch top-rated books: {top_rated_snapshots.last_error}',
             'books': []
         }), 500
+    
+    return snapshot_response({
+        'success': True,
+        **list_page(snapshot.data, limit, offset, fields)
+    }, snapshot, stale_while_revalidate=SNAPSHOT_INTERVAL)
+
+# Upper bound on books or IDs accepted by one library request
+MAX_LIBRARY_CHANGES = 500
+
+def library_user_id():
+    """Return the library owner from the X-User-Id header, or None"""
+    user_id = request.headers.get('X-User-Id', '').strip()
+    return user_id[:128] or None
+
+@app.route('/api/library', methods=['GET'])
+def get_library():
+    """Return library changes after ?since= (0 or omitted for the whole library)"""
+    user_id = library_user_id()
+    if user_id is None:
+        return jsonify({'success': False, 'error': 'X-User-Id header is required'}), 400
+    
+    try:
+        since = int(request.args.get('since') or 0)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since must be an integer'}), 400
+    
+    return jsonify({'success': True, **recommendation_engine.library.changes_since(user_id, since)})
+
+@app.route('/api/library/sync', methods=['POST'])
+def sync_library():
+    """
+    Apply a client's library deltas and return everything changed since its last sync
+    
+    Expects {"since": version, "added": [books], "removed": [book ids]}; the
+    /api/library/add and /api/library/remove routes accept just one side. Without
+    "since" only the new version is returned.
+    """
+    user_id = library_user_id()
+    if user_id is None:
+        return jsonify({'success': False, 'error': 'X-User-Id header is required'}), 400
+    
+    data = request.json or {}
+    added = data.get('added') or data.get('books') or []
+    removed = data.get('removed') or data.get('ids') or []
+    if not isinstance(added, list) or not isinstance(removed, list):
+        return jsonify({'success': False, 'error': 'added and removed must be lists'}), 400
+    if len(added) + len(removed) > MAX_LIBRARY_CHANGES:
+        return jsonify({'success': False, 'error': f'At most {MAX_LIBRARY_CHANGES} changes per request'}), 400
+    
+    try:
+        since = int(data['since']) if data.get('since') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'since must be an integer'}), 400
+    
+    library = recommendation_engine.library
+    if added:
+        library.add_many(user_id, [book for book in added if isinstance(book, dict)])
+    if removed:
+        library.remove_many(user_id, [str(book_id) for book_id in removed])
+    
+    # Without a since version, just acknowledge with the new version
+    changes = library.changes_since(user_id, since if since is not None else float('inf'))
+    return jsonify({'success': True, **changes})
+
+app.add_url_rule('/api/library/add', 'add_to_library', sync_library, methods=['POST'])
+app.add_url_rule('/api/library/remove', 'remove_from_library', sync_library, methods=['POST'])
+
+MAX_BOOK_IDS = 100
+
+@app.route('/api/books', methods=['GET'])
+def get_books():
+    """Re-resolve saved books by volume ID (?ids=) and/or ISBN (?isbns=), comma-separated"""
+    volume_ids = [v for v in request.args.get('ids', '').split(',') if v.strip()]
+    isbns = [v for v in request.args.get('isbns', '').split(',') if v.strip()]
+
+    if not volume_ids and not isbns:
+        return jsonify({'success': False, 'error': 'Provide ids or isbns'}), 400
+    if len(volume_ids) + len(isbns) > MAX_BOOK_IDS:
+        return jsonify({'success': False, 'error': f'At most {MAX_BOOK_IDS} identifiers per request'}), 400
+
+    books = [book for book in book_api.get_books_by_ids(v.strip() for v in volume_ids) if book]
+    books.extend(book for book in book_api.get_books_by_isbn(isbns).values() if book)
+
+    return jsonify({
+        'success': True,
+        'books': books,
+        'total_found': len(books)
+    })
+
+@app.route('/covers/<volume_id>')
+def get_cover(volume_id):
+    """Serve a book cover from the local cover cache"""
+    cover = cover_cache.get(volume_id)
+    if cover is None:
+        return jsonify({'error': 'Cover not found'}), 404
+    
+    path, digest, content_type = cover
+    # The URL names the volume, not the image, so a changed cover must show up after a revalidation;
+    # the content-hash ETag keeps revalidations to a 304
+    return send_file(path, mimetype=content_type, etag=digest, conditional=True, max_age=24 * 3600)
+
+# Cache hit/miss counters are read at scrape time, so the hot paths pay nothing extra
+REGISTRY.register_collector(cache_collector({
+    'books': book_api.cache,
+    'llm': recommendation_engine.ai_recommender.response_cache,
+    'preferences': recommendation_engine.ai_recommender.preference_cache,
+    'covers': cover_cache.index
+}))
+REGISTRY.register_collector(single_flight_collector({
+    # Shared by the model and Google Books clients
+    'engine': recommendation_engine.single_flight,
+    'covers': cover_cache.single_flight
+}))
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Book Recommender API is running'})
+    return jsonify({
+        'status': 'healthy',
+        'message': 'Book Recommender API is running',
+        'snapshots': [trending_snapshots.status(), top_rated_snapshots.status()],
+        'circuit_breakers': [book_api.circuit_breaker.status()]
+    })
 
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
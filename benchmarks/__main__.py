@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+from benchmarks.fakes import FakeBooksServer, FakeGenerativeModel, GENRES, Latency, load_fixture
+from benchmarks.harness import compare, format_report, measure_allocations, run_load, warm_up
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Numbers operations across all scenarios, so cold mode never repeats a title or preference set
+_operations = itertools.count()
+
+def load_app(server, model, cache_dir):
+    """
+    Import the Flask app wired to the fakes, with every on-disk cache in cache_dir
+
+    The fakes are installed before the import, since importing the app starts
+    the snapshot refreshers that call both upstreams.
+    """
+    os.environ['BOOKAI_CACHE_DIR'] = cache_dir
+    os.environ['BOOKAI_BOOKS_BASE_URL'] = server.base_url
+    # The fake server doesn't serve images
+    os.environ['BOOKAI_PREFETCH_COVERS'] = '0'
+    os.environ.setdefault('GEMINI_API_KEY', 'offline-benchmark')
+
+    import google.generativeai as genai
+    genai.GenerativeModel = lambda *args, **kwargs: model
+
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import app
+    return app
+
+def preferences(n, mode):
+    """Preferences for the nth call; warm mode cycles through four users, cold mode never repeats"""
+    if mode == 'warm':
+        n %= 4
+    return {
+        'genres': [GENRES[n % len(GENRES)], GENRES[(n + 3) % len(GENRES)]],
+        'favorite_books': [f"Reader {n} Favorite"],
+        'favorite_authors': []
+    }
+
+def build_scenario(name, app, volumes, args):
+    """Return a zero-argument callable performing one operation of the named scenario"""
+    counter = _operations
+    titles = [volume['volumeInfo']['title'] for volume in volumes]
+    engine = app.recommendation_engine
+    clients = threading.local()
+
+    def client():
+        if not hasattr(clients, 'client'):
+            clients.client = app.app.test_client()
+        return clients.client
+
+    def check(response):
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    def check_result(result):
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', 'Recommendation failed'))
+
+    def books():
+        n = next(counter)
+        if args.mode == 'warm':
+            batch = [titles[(n * args.batch + i) % len(titles)] for i in range(args.batch)]
+        else:
+            batch = [f"Benchmark Volume {n} Part {i}" for i in range(args.batch)]
+        app.book_api.get_multiple_books(batch)
+
+    def recommendations():
+        check_result(engine.get_recommendations(preferences(next(counter), args.mode), top_k=args.top_k))
+
+    def rerank():
+        check_result(engine.get_recommendations(preferences(next(counter), args.mode), top_k=args.top_k,
+                                                pool_size=args.top_k * 3))
+
+    def api_recommendations():
+        prefs = preferences(next(counter), args.mode)
+        check(client().post('/api/recommendations', json={
+            'genres': prefs['genres'],
+            'favoriteBooks': '\n'.join(prefs['favorite_books']),
+            'topK': args.top_k
+        }))
+
+    def api_books():
+        n = next(counter)
+        ids = [volumes[(n * args.batch + i) % len(volumes)]['id'] for i in range(args.batch)]
+        check(client().get('/api/books?ids=' + ','.join(ids)))
+
+    return {
+        'books': books,
+        'recommendations': recommendations,
+        'rerank': rerank,
+        'api-recommendations': api_recommendations,
+        'api-trending': lambda: check(client().get('/api/trending')),
+        'api-top-rated': lambda: check(client().get('/api/top-rated')),
+        'api-books': api_books
+    }[name]
+
+SCENARIOS = ('books', 'recommendations', 'rerank', 'api-recommendations', 'api-trending', 'api-top-rated', 'api-books')
+
+def run(args):
+    volumes = load_fixture(args.volumes)
+    responses = load_fixture(args.responses) if args.responses else None
+    server = FakeBooksServer(volumes, Latency.parse(args.books_latency), args.books_error_rate,
+                             miss_rate=args.miss_rate, seed=args.seed).start()
+    model = FakeGenerativeModel(volumes, responses, Latency.parse(args.llm_latency), args.llm_error_rate,
+                                args.unseen_rate, seed=args.seed)
+
+    with tempfile.TemporaryDirectory(prefix='bookai-bench-') as cache_dir:
+        app = load_app(server, model, cache_dir)
+        if args.books_rps:
+            from utils.rate_limiter import TokenBucket
+            app.book_api.rate_limiter = TokenBucket(args.books_rps)
+
+        # Build the snapshots now so their warm-up calls aren't counted
+        app.trending_snapshots.get()
+        app.top_rated_snapshots.get()
+
+        print(f"Fake Books: {server.latency}, error rate {args.books_error_rate}, miss rate {args.miss_rate}; "
+              f"fake Gemini: {model.latency}, error rate {args.llm_error_rate}, unseen rate {args.unseen_rate}")
+        print(f"{args.ops} ops per scenario, concurrency {args.concurrency}, {args.mode} caches\n")
+
+        results = []
+        for name in args.scenarios or SCENARIOS:
+            operation = build_scenario(name, app, volumes, args)
+            warm_up(operation, args.warmup)
+            books_before, model_before = server.stats()['requests'], model.stats()['calls']
+            result = {'scenario': name}
+            result.update(run_load(operation, args.ops, args.concurrency))
+            result['books_requests_per_op'] = round((server.stats()['requests'] - books_before) / args.ops, 2)
+            result['model_calls_per_op'] = round((model.stats()['calls'] - model_before) / args.ops, 2)
+            result.update(measure_allocations(operation, args.allocations))
+            results.append(result)
+            print(f"{name}: {result['throughput']} ops/s, p95 {result['p95_ms']} ms"
+                  + (f", {result['errors']} errors ({result['first_error']})" if result['errors'] else ''))
+
+        app.trending_snapshots.stop()
+        app.top_rated_snapshots.stop()
+    server.stop()
+
+    print()
+    print(format_report(results))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': {k: v for k, v in vars(args).items() if k != 'func'}, 'results': results}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    if args.baseline:
+        regressions = compare(results, load_fixture(args.baseline)['results'], args.tolerance)
+        if regressions:
+            print(f"\nRegressions against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+def record(args):
+    """Search the live Google Books API for titles and save the first hit of each as fixture volumes"""
+    import requests
+    volumes = load_fixture(args.output) if os.path.exists(args.output) else []
+    known = {volume['id'] for volume in volumes}
+    for title in args.titles:
+        params = {'q': f'intitle:"{title}"', 'maxResults': 1, 'printType': 'books'}
+        response = requests.get('https://www.googleapis.com/books/v1/volumes', params=params, timeout=10)
+        response.raise_for_status()
+        items = response.json().get('items') or []
+        if not items:
+            print(f"No volume found for '{title}'")
+        elif items[0]['id'] not in known:
+            known.add(items[0]['id'])
+            volumes.append(items[0])
+            print(f"Recorded '{items[0]['volumeInfo'].get('title')}' ({items[0]['id']})")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(volumes, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark BookAI offline against local stand-ins for Gemini and Google Books')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bench = commands.add_parser('run', help='Run benchmark scenarios')
+    bench.add_argument('scenarios', nargs='*', help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    bench.add_argument('--ops', type=int, default=100, help='Measured operations per scenario')
+    bench.add_argument('--concurrency', type=int, default=8, help='Operations in flight at once')
+    bench.add_argument('--warmup', type=int, default=5, help='Unmeasured operations run first')
+    bench.add_argument('--allocations', type=int, default=20,
+                       help='Operations traced with tracemalloc after the timed run (0 to skip)')
+    bench.add_argument('--mode', choices=('cold', 'warm'), default='cold',
+                       help='cold: every operation uses new titles and preferences; warm: a few repeat')
+    bench.add_argument('--batch', type=int, default=5, help='Titles per books operation, IDs per api-books request')
+    bench.add_argument('--top-k', type=int, default=5, help='Recommendations per request')
+    bench.add_argument('--llm-latency', default='lognormal:400:0.4',
+                       help="Gemini latency: 'fixed:MS', 'uniform:LOW:HIGH' or 'lognormal:MEDIAN:SIGMA'")
+    bench.add_argument('--llm-error-rate', type=float, default=0.0)
+    bench.add_argument('--unseen-rate', type=float, default=0.3,
+                       help='Fraction of recommended titles not in the fixtures')
+    bench.add_argument('--books-latency', default='lognormal:60:0.5', help='Google Books latency, as --llm-latency')
+    bench.add_argument('--books-error-rate', type=float, default=0.0)
+    bench.add_argument('--miss-rate', type=float, default=0.1,
+                       help='Fraction of exact title searches that find nothing')
+    bench.add_argument('--books-rps', type=float, default=0,
+                       help="Override the Books client's request rate limit (0 keeps the default)")
+    bench.add_argument('--volumes', default=os.path.join(FIXTURES, 'volumes.json'), help='Volume fixture file')
+    bench.add_argument('--responses', default=os.path.join(FIXTURES, 'model_responses.json'),
+                       help="Recorded model responses by prompt type ('' to generate all)")
+    bench.add_argument('--seed', type=int, default=1)
+    bench.add_argument('--json', help='Write results to this file')
+    bench.add_argument('--baseline', help='Results file from an earlier run to check for regressions')
+    bench.add_argument('--tolerance', type=float, default=0.15,
+                       help='Allowed p95 latency rise or throughput drop before a regression is reported')
+    bench.set_defaults(func=run)
+
+    rec = commands.add_parser('record', help='Record volumes from the live Google Books API as fixtures')
+    rec.add_argument('titles', nargs='+')
+    rec.add_argument('--output', default=os.path.join(FIXTURES, 'volumes.json'))
+    rec.set_defaults(func=record)
+
+    args = parser.parse_args(argv)
+    unknown = set(getattr(args, 'scenarios', None) or ()) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
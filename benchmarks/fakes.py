@@ -0,0 +1,339 @@
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from utils.text import normalize_isbn, normalize_text
+
+GENRES = ['Fiction', 'Mystery', 'Thriller', 'Romance', 'Fantasy', 'Science Fiction', 'History', 'Biography']
+
+_TITLE_WORDS = ('Silent', 'Hidden', 'Last', 'Glass', 'Winter', 'Paper', 'Iron', 'Midnight', 'Salt', 'Lantern',
+                'Harbor', 'Garden', 'Orchard', 'Archive', 'River', 'Kingdom', 'Letters', 'Museum', 'Tide', 'Atlas')
+
+def _digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+class Latency:
+    def __init__(self, kind='fixed', *params):
+        """
+        Latency distribution in milliseconds
+
+        Args:
+            kind (str): 'fixed' (ms), 'uniform' (low ms, high ms) or 'lognormal'
+                (median ms, sigma), the usual shape of network and model latency
+            params (float): Distribution parameters
+        """
+        if kind not in ('fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"Unknown latency distribution '{kind}'")
+        self.kind = kind
+        self.params = [float(param) for param in params] or [0.0]
+
+    @classmethod
+    def parse(cls, spec):
+        """Build a Latency from 'kind:param:param', e.g. 'lognormal:300:0.5'; a bare number is fixed"""
+        kind, *params = str(spec).split(':')
+        if not params:
+            return cls('fixed', kind)
+        return cls(kind, *params)
+
+    def sample(self, rng):
+        """Draw one delay in seconds"""
+        if self.kind == 'fixed':
+            ms = self.params[0]
+        elif self.kind == 'uniform':
+            ms = rng.uniform(self.params[0], self.params[1])
+        else:
+            median, sigma = self.params[0], self.params[1] if len(self.params) > 1 else 0.5
+            ms = rng.lognormvariate(0, sigma) * median
+        return max(0.0, ms) / 1000
+
+    def __str__(self):
+        return ':'.join([self.kind] + [f"{param:g}" for param in self.params])
+
+def load_fixture(path):
+    """Load a JSON fixture file"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+class FakeBooksServer:
+    def __init__(self, volumes=(), latency=None, error_rate=0.0, error_status=503, miss_rate=0.0, seed=0):
+        """
+        Local HTTP stand-in for the Google Books volumes endpoint
+
+        Fixture volumes are matched by title, ISBN and volume ID; any other title
+        gets a synthetic volume, so unseen titles resolve like real ones.
+
+        Args:
+            volumes (list): Recorded volume items in the Google Books response shape
+            latency (Latency, optional): Delay added to every volume request
+            error_rate (float): Fraction of volume requests answered with error_status
+            error_status (int): Status used for injected errors
+            miss_rate (float): Fraction of titles whose exact title search finds
+                nothing, which sends lookups down the fallback search path
+            seed (int): Seed for latency and error sampling
+        """
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.miss_rate = miss_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+        self._by_id = {}
+        self._by_title = {}
+        self._by_isbn = {}
+        for volume in volumes:
+            self._index(volume)
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @property
+    def base_url(self):
+        """Volumes endpoint to use as GoogleBooksAPI.base_url"""
+        return self.url + '/books/v1/volumes'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake-books', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self):
+        """Return volume requests served and errors injected so far"""
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors}
+
+    def _index(self, volume):
+        info = volume.get('volumeInfo', {})
+        self._by_id[volume['id']] = volume
+        self._by_title.setdefault(normalize_text(info.get('title')), volume)
+        for identifier in info.get('industryIdentifiers', []):
+            isbn = normalize_isbn(identifier.get('identifier'))
+            if isbn:
+                self._by_isbn[isbn] = volume
+
+    def _synthesize(self, title, author=None):
+        """Create and index a volume for a title that isn't in the fixtures"""
+        digest = _digest(normalize_text(title))
+        seed = int(digest[:8], 16)
+        volume = {
+            'id': 'bm' + digest[:10],
+            'volumeInfo': {
+                'title': title,
+                'authors': [author or 'Benchmark Author'],
+                'publishedDate': str(1950 + seed % 75),
+                'description': f"Synthetic volume for '{title}'.",
+                'categories': [GENRES[seed % len(GENRES)]],
+                'averageRating': 3 + (seed % 5) / 2,
+                'ratingsCount': seed % 5000,
+                'pageCount': 150 + seed % 500,
+                'publisher': 'Benchmark Press',
+                'industryIdentifiers': [{'type': 'ISBN_13', 'identifier': '978' + str(seed % 10 ** 10).zfill(10)}]
+            }
+        }
+        with self._lock:
+            self._index(volume)
+        return volume
+
+    def _misses(self, title):
+        """Whether an exact search for title is made to find nothing; stable per title"""
+        return self.miss_rate > 0 and int(_digest('miss:' + normalize_text(title))[:8], 16) / 0xffffffff < self.miss_rate
+
+    def _search(self, query, max_results):
+        """Return the volume items for a search query"""
+        if query.startswith('isbn:'):
+            isbns = [normalize_isbn(part.strip()[len('isbn:'):]) for part in query.split(' OR ')]
+            return [self._by_isbn[isbn] for isbn in isbns if isbn in self._by_isbn][:max_results]
+
+        title = re.search(r'intitle:"(.*?)"', query)
+        if title:
+            title = title.group(1)
+            author = re.search(r'inauthor:"(.*?)"', query)
+            volume = self._by_title.get(normalize_text(title))
+            if volume is None and self._misses(title):
+                return []
+            return [volume or self._synthesize(title, author.group(1) if author else None)]
+
+        # Fallback search: fixture titles containing every query word
+        words = normalize_text(query).split()
+        with self._lock:
+            matches = [volume for key, volume in self._by_title.items() if all(word in key for word in words)]
+        return matches[:max_results] or [self._synthesize(query)]
+
+    def _handle(self, path, query):
+        """Return (status, body) for a request"""
+        if not path.startswith('/books/v1/volumes'):
+            return 404, b'{"error": "not found"}'
+
+        with self._lock:
+            self.requests += 1
+            delay = self.latency.sample(self._rng)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        time.sleep(delay)
+        if failed:
+            return self.error_status, b'{"error": {"message": "Injected error"}}'
+
+        volume_id = path[len('/books/v1/volumes'):].strip('/')
+        if volume_id:
+            volume = self._by_id.get(volume_id)
+            if volume is None:
+                return 404, b'{"error": {"message": "The volume ID could not be found."}}'
+            return 200, json.dumps(volume).encode('utf-8')
+
+        params = parse_qs(query)
+        items = self._search(params.get('q', [''])[0], int(params.get('maxResults', ['10'])[0]))
+        body = {'kind': 'books#volumes', 'totalItems': len(items)}
+        if items:
+            body['items'] = items
+        return 200, json.dumps(body).encode('utf-8')
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so pooled client connections are reused as with the real API
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                status, body = fake._handle(parts.path, parts.query)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+class FakeResponse:
+    def __init__(self, text):
+        """Stand-in for a GenerateContentResponse or one streamed chunk"""
+        self.text = text
+
+class FakeGenerativeModel:
+    def __init__(self, volumes=(), responses=None, latency=None, error_rate=0.0, unseen_rate=0.0, seed=0):
+        """
+        Offline stand-in for genai.GenerativeModel
+
+        Recommendation answers are JSON Lines drawn from the fixture volumes, the
+        same prompt always getting the same books. Recorded responses, when given
+        for a prompt type, are replayed in turn instead.
+
+        Args:
+            volumes (list): Volume items whose titles and authors are recommended
+            responses (dict, optional): Prompt type ('recommendations', 'batch',
+                'trending', 'top_rated') -> list of recorded response texts
+            latency (Latency, optional): Total generation time per call; streamed
+                calls deliver the first line at 40% of it
+            error_rate (float): Fraction of calls that raise
+            unseen_rate (float): Fraction of recommended titles invented fresh, so
+                their Books lookups miss every cache
+            seed (int): Seed for latency, error and title sampling
+        """
+        self.books = [(volume['volumeInfo']['title'], (volume['volumeInfo'].get('authors') or [None])[0],
+                       next((identifier['identifier'] for identifier in volume['volumeInfo'].get('industryIdentifiers', [])
+                             if identifier.get('type') == 'ISBN_13'), None))
+                      for volume in volumes]
+        self.responses = {kind: itertools.cycle(texts) for kind, texts in (responses or {}).items() if texts}
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.unseen_rate = unseen_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._unseen = itertools.count(1)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def stats(self):
+        """Return calls made and errors raised so far"""
+        with self._lock:
+            return {'calls': self.calls, 'errors': self.errors}
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+            delay = self.latency.sample(self._rng)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            text = self._respond(prompt)
+
+        if stream:
+            return self._stream(text, delay, failed)
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("503 The model is overloaded (injected error)")
+        return FakeResponse(text)
+
+    def _stream(self, text, delay, failed):
+        lines = text.splitlines(True) or ['']
+        time.sleep(delay * 0.4)
+        if failed:
+            raise RuntimeError("503 The model is overloaded (injected error)")
+        for index, line in enumerate(lines):
+            if index:
+                time.sleep(delay * 0.6 / max(1, len(lines) - 1))
+            yield FakeResponse(line)
+
+    def _respond(self, prompt):
+        """Build the response text for a prompt; the caller holds the lock"""
+        if 'For each of the following users' in prompt:
+            kind = 'batch'
+        elif 'trending book recommendations' in prompt:
+            kind = 'trending'
+        elif 'top-rated book recommendations' in prompt:
+            kind = 'top_rated'
+        else:
+            kind = 'recommendations'
+
+        if kind in self.responses:
+            return next(self.responses[kind])
+
+        count = re.search(r'(?:recommend|Provide) (\d+)', prompt)
+        count = int(count.group(1)) if count else 5
+        # The same prompt picks the same fixture books, like a well-behaved model
+        rng = random.Random(f"{self.seed}:{prompt}")
+
+        if kind == 'batch':
+            users = len(re.findall(r'^\s*User \d+:', prompt, re.MULTILINE))
+            return json.dumps({str(number): [self._book(rng, with_isbn=False) for _ in range(count)]
+                               for number in range(1, users + 1)})
+        return '\n'.join(json.dumps(self._book(rng, with_isbn=kind == 'recommendations')) for _ in range(count))
+
+    def _book(self, rng, with_isbn):
+        if not self.books or rng.random() < self.unseen_rate:
+            title = f"The {rng.choice(_TITLE_WORDS)} {rng.choice(_TITLE_WORDS)} {next(self._unseen)}"
+            return {'title': title, 'author': 'Benchmark Author'}
+
+        title, author, isbn = rng.choice(self.books)
+        book = {'title': title, 'author': author}
+        if with_isbn and isbn and rng.random() < 0.5:
+            book['isbn'] = isbn
+        return book
@@ -0,0 +1,154 @@
+import gc
+import threading
+import time
+import tracemalloc
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+def warm_up(operation, ops):
+    """Call operation ops times without measuring, ignoring errors"""
+    for _ in range(ops):
+        try:
+            operation()
+        except Exception:
+            pass
+
+def run_load(operation, ops, concurrency=1):
+    """
+    Call operation ops times from concurrency threads and time each call
+
+    Args:
+        operation (callable): Zero-argument callable; raising counts as an error
+        ops (int): Measured calls
+        concurrency (int): Calls in flight at once
+
+    Returns:
+        dict: ops, errors, seconds, throughput (calls/s) and latency percentiles in ms
+    """
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def timed():
+        start = time.perf_counter()
+        try:
+            operation()
+            error = None
+        except Exception as e:
+            error = e
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if error is not None:
+                errors.append(error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='bench') as executor:
+        for future in [executor.submit(timed) for _ in range(ops)]:
+            future.result()
+    seconds = time.perf_counter() - start
+
+    result = {
+        'ops': ops,
+        'errors': len(errors),
+        'seconds': round(seconds, 3),
+        'throughput': round(ops / seconds, 2) if seconds else 0.0
+    }
+    result.update(latency_summary(latencies))
+    if errors:
+        result['first_error'] = repr(errors[0])
+    return result
+
+def latency_summary(latencies):
+    """Return mean, p50, p95, p99 and max in milliseconds for latencies in seconds"""
+    if not latencies:
+        return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(ms.max()), 3)
+    }
+
+def measure_allocations(operation, ops):
+    """
+    Trace Python memory allocations over ops sequential calls
+
+    Run separately from run_load, since tracing slows every allocation down.
+
+    Returns:
+        dict: 'alloc_kib_per_op', the memory allocated per call and not yet freed
+            when it returned (caches, leaks), and 'peak_kib', the high-water mark
+            above the starting point while the calls ran
+    """
+    if ops <= 0:
+        return {}
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        warm_up(operation, ops)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    growth = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return {
+        'alloc_kib_per_op': round(growth / ops / 1024, 2),
+        'peak_kib': round((peak - baseline) / 1024, 1)
+    }
+
+COLUMNS = [
+    ('scenario', 'scenario', 22),
+    ('ops', 'ops', 6),
+    ('errors', 'err', 5),
+    ('throughput', 'ops/s', 9),
+    ('p50_ms', 'p50 ms', 9),
+    ('p95_ms', 'p95 ms', 9),
+    ('p99_ms', 'p99 ms', 9),
+    ('books_requests_per_op', 'books/op', 9),
+    ('model_calls_per_op', 'llm/op', 7),
+    ('alloc_kib_per_op', 'KiB/op', 8),
+    ('peak_kib', 'peak KiB', 9)
+]
+
+def format_report(results):
+    """Render results as a fixed-width table"""
+    lines = [' '.join(f"{title:>{width}}" if index else f"{title:<{width}}"
+                      for index, (_, title, width) in enumerate(COLUMNS))]
+    for result in results:
+        cells = []
+        for index, (key, _, width) in enumerate(COLUMNS):
+            value = result.get(key, '-')
+            cells.append(f"{value:<{width}}" if index == 0 else f"{value:>{width}}")
+        lines.append(' '.join(cells))
+    return '\n'.join(lines)
+
+def compare(results, baseline, tolerance=0.15):
+    """
+    Find regressions against a baseline run
+
+    A scenario regresses when its p95 latency rose, or its throughput fell, by
+    more than tolerance.
+
+    Returns:
+        list: One message per regression
+    """
+    previous = {result['scenario']: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result['scenario'])
+        if not old:
+            continue
+        if old['p95_ms'] and result['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{result['scenario']}: p95 {old['p95_ms']} ms -> {result['p95_ms']} ms")
+        if old['throughput'] and result['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: throughput {old['throughput']} -> {result['throughput']} ops/s")
+    return regressions
@@ -1,14 +1,65 @@
 from utils.ai_recommender import BookRecommender
 from utils.book_api import GoogleBooksAPI
+from utils.metrics import RECOMMENDATION_SECONDS
+from utils.scoring import PreferenceScorer
+from utils.single_flight import SingleFlight
+from utils.text import make_book_key, normalize_text
+from utils.tracing import span
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import heapq
 import time
 
 class BookRecommendationEngine:
-    def __init__(self):
-        """Initialize the complete book recommendation system"""
-        self.ai_recommender = BookRecommender()
-        self.books_api = GoogleBooksAPI()
+    def __init__(self, single_flight=None, library=None):
+        """
+        Initialize the complete book recommendation system
+        
+        Args:
+            single_flight (SingleFlight, optional): Coalescing group shared by both upstreams
+            library (LibraryStore, optional): Saved books used by personalize_preferences
+        """
+        # One coalescing group for both upstreams; their keys are namespaced
+        self.single_flight = single_flight or SingleFlight()
+        self.ai_recommender = BookRecommender(single_flight=self.single_flight)
+        self.books_api = GoogleBooksAPI(single_flight=self.single_flight)
+        self.library = library
+        self._async_ai_recommender = None
+        self._async_books_api = None
+    
+    # Stop resolving an over-generated pool once top_k books score at least this
+    RERANK_CUTOFF_SCORE = 75
     
-    def get_recommendations(self, user_preferences):
+    def personalize_preferences(self, user_preferences, user_id):
+        """
+        Fill in preferences from a user's saved library
+        
+        Genres and favorite authors the user left empty are seeded from the most
+        common ones in their library, and saved titles are listed under 'owned_books'
+        so they aren't recommended again.
+        
+        Args:
+            user_preferences (dict): Preferences from the request, possibly empty
+            user_id (str): Library owner
+        
+        Returns:
+            dict: Personalized copy of user_preferences
+        """
+        preferences = dict(user_preferences)
+        if self.library is None or not user_id:
+            return preferences
+        
+        with span('library.profile'):
+            profile = self.library.profile(user_id)
+        if not preferences.get('genres'):
+            preferences['genres'] = profile['genres']
+        if not preferences.get('favorite_authors'):
+            preferences['favorite_authors'] = profile['authors']
+        if profile['titles']:
+            preferences['owned_books'] = profile['titles']
+        return preferences
+    
+    @RECOMMENDATION_SECONDS.time(mode='single')
+    def get_recommendations(self, user_preferences, top_k=5, pool_size=None):
         """
         Get complete book recommendations with detailed information
         
@@ -17,12 +68,31 @@ class BookRecommendationEngine:
                 - genres: list of favorite genres
                 - favorite_books: list of favorite book titles
                 - favorite_authors: list of favorite authors
+                - owned_books (optional): titles already in the user's library
+            top_k (int): Number of recommendations to return
+            pool_size (int, optional): Ask the AI for this many candidates and return the
+                top_k by relevance score (see get_reranked_recommendations)
         
         Returns:
             dict: Complete recommendation results
         """
-        # Step 1: Get AI recommendations (silent mode)
-        recommended_titles = self.ai_recommender.generate_recommendations(user_preferences)
+        # Owned books are filtered after lookup, so ask for spares to fill their places
+        if user_preferences.get('owned_books') and not pool_size:
+            pool_size = top_k * 2
+        
+        if pool_size and pool_size > top_k:
+            return self.get_reranked_recommendations(user_preferences, top_k, pool_size)
+        
+        # Steps 1 and 2 overlap: each title streamed from the AI is looked up
+        # as soon as it is parsed, while the model is still generating the rest
+        recommended_titles = []
+        
+        def stream_titles():
+            for title in self.ai_recommender.stream_recommendations(user_preferences, top_k):
+                recommended_titles.append(title)
+                yield title
+        
+        detailed_books = self.books_api.get_multiple_books(stream_titles())
         
         if not recommended_titles:
             return {
@@ -31,11 +101,6 @@ class BookRecommendationEngine:
                 'recommendations': []
             }
         
-        # Step 2: Get detailed book information (silent mode)
-        
-        # Step 2: Get detailed book information
-        detailed_books = self.books_api.get_multiple_books(recommended_titles)
-        
         # Step 3: Combine and enhance the data
         recommendations = self._create_enhanced_recommendations(
             user_preferences, 
@@ -51,117 +116,312 @@ class BookRecommendationEngine:
             'generation_time': time.strftime('%Y-%m-%d %H:%M:%S')
         }
     
-    def _create_enhanced_recommendations(self, preferences, ai_titles, book_details):
-        """Create enhanced recommendations with AI explanations"""
-        enhanced_recommendations = []
+    def get_reranked_recommendations(self, user_preferences, top_k=5, pool_size=25, cutoff_score=None):
+        """
+        Over-generate candidates and return the best top_k by relevance score
         
-        for i, (ai_title, book_data) in enumerate(zip(ai_titles, book_details)):
-            # Generate explanation for why this book was recommended
-            explanation = self._generate_recommendation_explanation(
-                preferences, book_data
-            )
-            
-            # Calculate a relevance score
-            relevance_score = self._calculate_relevance_score(
-                preferences, book_data
-            )
-            
-            enhanced_book = {
-                **book_data,  # All the Google Books data
-                'recommendation_rank': i + 1,
-                'ai_recommended_title': ai_title,
-                'recommendation_explanation': explanation,
-                'relevance_score': relevance_score,
-                'match_reasons': self._get_match_reasons(preferences, book_data)
+        Candidates are resolved concurrently and scored as each lookup completes.
+        Placeholders, duplicate editions and the user's favorite and owned books are dropped.
+        Remaining lookups are cancelled once top_k books reach cutoff_score.
+        
+        Args:
+            user_preferences (dict): Same shape as for get_recommendations
+            top_k (int): Number of recommendations to return
+            pool_size (int): Number of candidate titles to ask the AI for
+            cutoff_score (float, optional): Early-exit score, defaults to RERANK_CUTOFF_SCORE
+        
+        Returns:
+            dict: Complete recommendation results, plus 'candidates_considered'
+        """
+        if cutoff_score is None:
+            cutoff_score = self.RERANK_CUTOFF_SCORE
+        
+        candidate_titles = self.ai_recommender.generate_recommendations(user_preferences, count=pool_size)
+        
+        if not candidate_titles:
+            return {
+                'success': False,
+                'error': 'Failed to generate recommendations',
+                'recommendations': []
             }
-            
-            enhanced_recommendations.append(enhanced_book)
         
-        return enhanced_recommendations
+        scorer = PreferenceScorer(user_preferences)
+        favorites = {normalize_text(title) for title in
+                     user_preferences.get('favorite_books', []) + user_preferences.get('owned_books', [])}
+        seen = set()
+        best = []  # Min-heap of (score, -ai_index, scored book) holding the top_k so far
+        considered = 0
+        
+        books = self.books_api.iter_multiple_books(candidate_titles)
+        try:
+            for index, book_data in books:
+                considered += 1
+                if book_data.get('placeholder') or normalize_text(book_data['title']) in favorites:
+                    continue
+                
+                key = book_data.get('google_books_id') or make_book_key(book_data['title'], book_data['author_string'])
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                with span('score'):
+                    score, explanation, reasons = scorer.score(book_data)
+                entry = (score, -index, (candidate_titles[index], book_data, score, explanation, reasons))
+                if len(best) < top_k:
+                    heapq.heappush(best, entry)
+                elif entry[:2] > best[0][:2]:
+                    heapq.heapreplace(best, entry)
+                
+                if len(best) == top_k and best[0][0] >= cutoff_score:
+                    break
+        finally:
+            # Closing the generator cancels lookups that haven't started
+            books.close()
+        
+        ranked = [item for _, _, item in sorted(best, key=lambda entry: entry[:2], reverse=True)]
+        recommendations = [
+            self._enhance_book(rank, ai_title, book_data, score, explanation, reasons)
+            for rank, (ai_title, book_data, score, explanation, reasons) in enumerate(ranked, 1)
+        ]
+        
+        return {
+            'success': True,
+            'user_preferences': user_preferences,
+            'recommendations': recommendations,
+            'total_found': len(recommendations),
+            'candidates_considered': considered,
+            'pool_size': len(candidate_titles),
+            'generation_time': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
     
-    def _generate_recommendation_explanation(self, preferences, book_data):
-        """Generate an explanation for why this book was recommended"""
-        reasons = []
+    def get_recommendations_batch(self, preferences_list, users_per_prompt=5, top_k=5):
+        """
+        Generate recommendations for many users, yielding each user's result when ready
         
-        # Check genre matches
-        user_genres = [g.lower() for g in preferences.get('genres', [])]
-        book_categories = [c.lower() for c in book_data.get('categories', [])]
+        Users are packed several to a prompt and the prompts run concurrently.
+        Titles are de-duplicated across all users before any Books lookup.
         
-        genre_matches = [genre for genre in user_genres 
-                        if any(genre in category for category in book_categories)]
+        Args:
+            preferences_list (list): One user preferences dict per user
+            users_per_prompt (int): Users packed into each AI prompt
+            top_k (int): Recommendations per user
         
-        if genre_matches:
-            reasons.append(f"matches your interest in {', '.join(genre_matches)}")
+        Yields:
+            tuple: (index into preferences_list, result dict shaped like get_recommendations)
+        """
+        groups = [
+            list(range(start, min(start + users_per_prompt, len(preferences_list))))
+            for start in range(0, len(preferences_list), users_per_prompt)
+        ]
+        if not groups:
+            return
         
-        # Check author style similarity
-        user_authors = preferences.get('favorite_authors', [])
-        if user_authors:
-            reasons.append("has a writing style similar to your favorite authors")
+        start = time.perf_counter()
+        resolved = {}  # Normalized title -> book details, shared by all users
         
-        # Check for high ratings
-        rating = book_data.get('average_rating')
-        if rating and rating >= 4.0:
-            reasons.append(f"has excellent ratings ({rating}/5)")
+        executor = ThreadPoolExecutor(max_workers=min(len(groups), 4))
+        try:
+            futures = {
+                executor.submit(
+                    self.ai_recommender.generate_recommendations_batch,
+                    [preferences_list[i] for i in group],
+                    top_k
+                ): group
+                for group in groups
+            }
+            
+            for future in as_completed(futures):
+                group = futures[future]
+                titles_by_user = future.result()
+                
+                # Look up each title once, however many users were recommended it
+                needed = []
+                for titles in titles_by_user:
+                    for title in titles:
+                        key = normalize_text(title)
+                        if key not in resolved:
+                            resolved[key] = None
+                            needed.append(title)
+                for title, book in zip(needed, self.books_api.get_multiple_books(needed)):
+                    resolved[normalize_text(title)] = book
+                
+                for index, titles in zip(group, titles_by_user):
+                    yield index, self._batch_result(preferences_list[index], titles, resolved)
+            
+            RECOMMENDATION_SECONDS.observe(time.perf_counter() - start, mode='batch')
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _batch_result(self, user_preferences, titles, resolved):
+        """Build one user's result from the shared title -> book map"""
+        if not titles:
+            return {
+                'success': False,
+                'error': 'Failed to generate recommendations',
+                'recommendations': []
+            }
         
-        # Default explanation
-        if not reasons:
-            reasons.append("matches your reading preferences based on AI analysis")
+        # Copy so per-user annotations don't leak between users sharing a book
+        detailed_books = [dict(resolved[normalize_text(title)]) for title in titles]
         
-        return f"Recommended because it {' and '.join(reasons)}."
+        return {
+            'success': True,
+            'user_preferences': user_preferences,
+            'recommendations': self._create_enhanced_recommendations(user_preferences, titles, detailed_books),
+            'total_found': len([book for book in detailed_books if not book.get('placeholder')]),
+            'generation_time': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
     
-    def _calculate_relevance_score(self, preferences, book_data):
-        """Calculate a relevance score (0-100)"""
-        score = 50  # Base score
+    async def get_recommendations_async(self, user_preferences, top_k=5):
+        """
+        Asyncio variant of get_recommendations
+        
+        Uses an aiohttp-backed Books client and an async model wrapper that share
+        this engine's caches, so one worker can serve many requests concurrently.
         
-        # Genre matching
-        user_genres = [g.lower() for g in preferences.get('genres', [])]
-        book_categories = [c.lower() for c in book_data.get('categories', [])]
+        Args:
+            user_preferences (dict): Same shape as for get_recommendations
+            top_k (int): Number of recommendations to return
         
-        genre_matches = sum(1 for genre in user_genres 
-                           if any(genre in category for category in book_categories))
-        score += genre_matches * 10
+        Returns:
+            dict: Complete recommendation results
+        """
+        ai_recommender, books_api = self._get_async_clients()
+        
+        # As in get_recommendations, ask for spares to fill the places of owned books
+        owned = self._owned_titles(user_preferences)
+        recommended_titles = await ai_recommender.generate_recommendations(
+            user_preferences, top_k * 2 if owned else top_k)
+        
+        if not recommended_titles:
+            return {
+                'success': False,
+                'error': 'Failed to generate recommendations',
+                'recommendations': []
+            }
         
-        # Rating bonus
-        rating = book_data.get('average_rating')
-        if rating:
-            score += (rating - 3) * 5  # Bonus for ratings above 3
+        detailed_books = await books_api.get_multiple_books(recommended_titles)
+        recommended_titles, detailed_books = self._drop_owned(owned, recommended_titles, detailed_books)
+        recommended_titles, detailed_books = recommended_titles[:top_k], detailed_books[:top_k]
         
-        # Popularity bonus (based on ratings count)
-        ratings_count = book_data.get('ratings_count')
-        if ratings_count:
-            if ratings_count > 1000:
-                score += 5
-            if ratings_count > 10000:
-                score += 5
+        recommendations = self._create_enhanced_recommendations(
+            user_preferences,
+            recommended_titles,
+            detailed_books
+        )
         
-        # Ensure score is between 0-100
-        return max(0, min(100, score))
+        return {
+            'success': True,
+            'user_preferences': user_preferences,
+            'recommendations': recommendations,
+            'total_found': len([book for book in detailed_books if not book.get('placeholder')]),
+            'generation_time': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
     
-    def _get_match_reasons(self, preferences, book_data):
-        """Get specific reasons why this book matches user preferences"""
-        reasons = []
+    def _owned_titles(self, user_preferences):
+        """Normalized titles of the books the user already has"""
+        return {normalize_text(title) for title in user_preferences.get('owned_books', [])}
+    
+    def _drop_owned(self, owned, titles, books):
+        """Drop recommendations the user owns, matching the AI's title or the resolved one"""
+        kept = [(title, book) for title, book in zip(titles, books)
+                if normalize_text(title) not in owned and normalize_text(book.get('title')) not in owned]
+        return [title for title, _ in kept], [book for _, book in kept]
+    
+    def _get_async_clients(self):
+        """Create the async clients on first use so aiohttp stays optional for sync callers"""
+        if self._async_books_api is None:
+            from utils.async_ai_recommender import AsyncBookRecommender
+            from utils.async_book_api import AsyncGoogleBooksAPI
+            
+            self._async_ai_recommender = AsyncBookRecommender(self.ai_recommender)
+            self._async_books_api = AsyncGoogleBooksAPI(self.books_api)
+        return self._async_ai_recommender, self._async_books_api
+    
+    async def aclose(self):
+        """Close the async Books client's HTTP session"""
+        if self._async_books_api is not None:
+            await self._async_books_api.close()
+    
+    def iter_recommendations(self, user_preferences):
+        """
+        Stream recommendations as each book's details arrive
         
-        # Genre matches
-        user_genres = [g.lower() for g in preferences.get('genres', [])]
-        book_categories = [c.lower() for c in book_data.get('categories', [])]
+        Args:
+            user_preferences (dict): Same shape as for get_recommendations
         
-        for genre in user_genres:
-            for category in book_categories:
-                if genre in category:
-                    reasons.append(f"Genre: {genre.title()}")
-                    break
+        Yields:
+            tuple: (event name, payload) where event is 'titles' (the raw AI titles),
+                'book' (one enhanced recommendation, in completion order), 'summary'
+                (totals once every lookup is done) or 'error'
+        """
+        start = time.perf_counter()
+        recommended_titles = self.ai_recommender.generate_recommendations(user_preferences)
+        owned = self._owned_titles(user_preferences)
+        if owned:
+            recommended_titles = [title for title in recommended_titles if normalize_text(title) not in owned]
         
-        # High rating
-        rating = book_data.get('average_rating')
-        if rating and rating >= 4.0:
-            reasons.append(f"Highly Rated: {rating}⭐")
+        if not recommended_titles:
+            yield 'error', {
+                'success': False,
+                'error': 'Failed to generate recommendations'
+            }
+            return
+        
+        yield 'titles', {'titles': recommended_titles}
         
-        # Popular book
-        ratings_count = book_data.get('ratings_count')
-        if ratings_count and ratings_count > 5000:
-            reasons.append("Popular Choice")
+        scorer = PreferenceScorer(user_preferences)
+        total_found = 0
+        for index, book_data in self.books_api.iter_multiple_books(recommended_titles):
+            if not book_data.get('placeholder'):
+                total_found += 1
+            yield 'book', self._enhance_book(
+                index + 1, recommended_titles[index], book_data, *scorer.score(book_data)
+            )
         
-        return reasons[:3]  # Limit to top 3 reasons
+        RECOMMENDATION_SECONDS.observe(time.perf_counter() - start, mode='stream')
+        yield 'summary', {
+            'success': True,
+            'user_preferences': user_preferences,
+            'total_found': total_found,
+            'generation_time': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def _create_enhanced_recommendations(self, preferences, ai_titles, book_details):
+        """Create enhanced recommendations with AI explanations"""
+        book_details = book_details[:len(ai_titles)]
+        
+        # Score the whole list in one pass with the preference features prepared once
+        with span('score', books=len(book_details)):
+            scored = PreferenceScorer(preferences).score_batch(book_details)
+        
+        return [
+            self._enhance_book(i + 1, ai_title, book_data, *book_scores)
+            for i, (ai_title, book_data, book_scores) in enumerate(zip(ai_titles, book_details, scored))
+        ]
+    
+    def _enhance_book(self, rank, ai_title, book_data, relevance_score, explanation, match_reasons):
+        """Add ranking, explanation and relevance details to one book"""
+        return {
+            **book_data,  # All the Google Books data
+            'recommendation_rank': rank,
+            'ai_recommended_title': ai_title,
+            'recommendation_explanation': explanation,
+            'relevance_score': relevance_score,
+            'match_reasons': match_reasons
+        }
+    
+    def _generate_recommendation_explanation(self, preferences, book_data):
+        """Generate an explanation for why this book was recommended"""
+        return PreferenceScorer(preferences).explanation(book_data)
+    
+    def _calculate_relevance_score(self, preferences, book_data):
+        """Calculate a relevance score (0-100)"""
+        return PreferenceScorer(preferences).relevance_score(book_data)
+    
+    def _get_match_reasons(self, preferences, book_data):
+        """Get specific reasons why this book matches user preferences"""
+        return PreferenceScorer(preferences).match_reasons(book_data)
 
 # Test function
 def test_recommendation_engine():
@@ -59,11 +59,20 @@ document.addEventListener('DOMContentLoaded', function() {
         };
         
         try {
+            // Render cards as they arrive when the browser can read streamed responses
+            if (window.ReadableStream && window.TextDecoder) {
+                const streamed = await streamRecommendations(requestData);
+                if (streamed) {
+                    return;
+                }
+            }
+            
             // Make API call
             const response = await fetch('/api/recommendations', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    'X-User-Id': getLibraryUserId()
                 },
                 body: JSON.stringify(requestData)
             });
@@ -90,6 +99,95 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+    // Consume /api/recommendations/stream, placing each card in its rank slot as it arrives.
+    // Resolves to false if the stream could not be opened so the caller can fall back.
+    async function streamRecommendations(requestData) {
+        let response;
+        try {
+            response = await fetch('/api/recommendations/stream', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream',
+                    'X-User-Id': getLibraryUserId()
+                },
+                body: JSON.stringify(requestData)
+            });
+        } catch (error) {
+            return false;
+        }
+        
+        if (!response.ok || !response.body) {
+            return false;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let slots = [];
+        let rendered = 0;
+        
+        const handleEvent = (event, payload) => {
+            if (event === 'titles') {
+                // Reserve one slot per title so cards keep their rank order
+                bookList.innerHTML = '';
+                slots = payload.titles.map(() => {
+                    const slot = document.createElement('div');
+                    slot.className = 'book-card-slot';
+                    bookList.appendChild(slot);
+                    return slot;
+                });
+                loading.classList.add('hidden');
+                recommendations.classList.remove('hidden');
+                recommendations.scrollIntoView({ behavior: 'smooth' });
+            } else if (event === 'book') {
+                const rank = payload.recommendation_rank;
+                const slot = slots[rank - 1];
+                const card = createBookCard(payload, rank);
+                if (slot) {
+                    slot.replaceWith(card);
+                } else {
+                    bookList.appendChild(card);
+                }
+                rendered++;
+            } else if (event === 'error') {
+                throw new Error(payload.error || 'Failed to generate recommendations');
+            } else if (event === 'summary' && rendered === 0) {
+                showError('No recommendations found. Please try different preferences.');
+            }
+        };
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                });
+                if (data) {
+                    handleEvent(event, JSON.parse(data));
+                }
+            }
+        }
+        
+        return true;
+    }
+    
     function displayRecommendations(books) {
         // Clear previous results
         bookList.innerHTML = '';
@@ -176,12 +274,21 @@ document.addEventListener('click', function(e) {
     }
 });
 
+// Serve covers through the local cover cache when the volume ID is known
+function coverUrl(book, placeholder) {
+    if (book.google_books_id && book.thumbnail) {
+        return `/covers/${encodeURIComponent(book.google_books_id)}`;
+    }
+    return book.thumbnail || placeholder;
+}
+
 // Global createBookCard function
 function createBookCard(book, rank) {
     const card = document.createElement('div');
     card.className = 'book-card';
     
-    const thumbnail = book.thumbnail || 'https://via.placeholder.com/128x192/cccccc/666666?text=No+Cover';
+    const placeholder = 'https://via.placeholder.com/128x192/cccccc/666666?text=No+Cover';
+    const thumbnail = coverUrl(book, placeholder);
     const rating = book.average_rating ? `⭐ ${book.average_rating}/5` : 'No rating';
     const ratingCount = book.ratings_count ? `(${book.ratings_count.toLocaleString()} reviews)` : '';
     const pageCount = book.page_count ? `📄 ${book.page_count} pages` : '';
@@ -190,7 +297,7 @@ function createBookCard(book, rank) {
     card.innerHTML = `
         <div class="book-rank">#${rank}</div>
         <div class="book-image">
-            <img src="${thumbnail}" alt="${book.title}" loading="lazy">
+            <img src="${thumbnail}" alt="${book.title}" loading="lazy" onerror="this.onerror=null; this.src='${placeholder}'">
         </div>
         <div class="book-info">
             <h3 class="book-title">${book.title}</h3>
@@ -248,8 +355,159 @@ function createBookCard(book, rank) {
 }
 
 // Global library functions
+
+// Anonymous ID under which the server keeps this browser's library
+function getLibraryUserId() {
+    let userId = localStorage.getItem('libraryUserId');
+    if (!userId) {
+        userId = window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        localStorage.setItem('libraryUserId', userId);
+    }
+    return userId;
+}
+
+// localStorage stays the offline copy of the library. Changes are queued under
+// 'libraryPending' and sent one delta at a time, in order, so a change made
+// while the server is unreachable is retried rather than lost. 'libraryVersion'
+// is the last server version merged in, so only newer changes are pulled.
+const LIBRARY_RETRY_MS = 30000;
+let libraryFlush = null;
+let libraryRetryTimer = null;
+
+function readLibrary() {
+    return JSON.parse(localStorage.getItem('library')) || [];
+}
+
+function readPendingLibraryChanges() {
+    return JSON.parse(localStorage.getItem('libraryPending')) || [];
+}
+
+function syncLibraryChange(delta) {
+    const pending = readPendingLibraryChanges();
+    pending.push(delta);
+    localStorage.setItem('libraryPending', JSON.stringify(pending));
+    flushLibraryChanges();
+}
+
+async function libraryRequest(path, options = {}) {
+    const response = await fetch(path, {
+        ...options,
+        headers: {
+            'Content-Type': 'application/json',
+            'X-User-Id': getLibraryUserId()
+        }
+    });
+    const data = await response.json().catch(() => ({}));
+    if (!response.ok || !data.success) {
+        const error = new Error(data.error || `HTTP error! status: ${response.status}`);
+        error.status = response.status;
+        throw error;
+    }
+    return data;
+}
+
+// Merge server changes into the local copy and remember the version they bring us to
+function applyLibraryChanges(changes) {
+    const removed = new Set(changes.removed || []);
+    const updated = new Map((changes.books || []).map(book => [libraryBookId(book), book]));
+    const changed = removed.size > 0 || updated.size > 0;
+
+    const library = [];
+    for (const book of readLibrary()) {
+        const id = libraryBookId(book);
+        if (removed.has(id)) {
+            continue;
+        }
+        if (updated.has(id)) {
+            library.push(updated.get(id));
+            updated.delete(id);
+        } else {
+            library.push(book);
+        }
+    }
+    library.push(...updated.values());
+
+    localStorage.setItem('library', JSON.stringify(library));
+    localStorage.setItem('libraryVersion', String(changes.version || 0));
+    if (changed) {
+        renderLibrary();
+    }
+}
+
+// Send queued deltas, then pull whatever else changed since the last merged version
+function flushLibraryChanges() {
+    if (libraryFlush) {
+        return libraryFlush;
+    }
+    clearTimeout(libraryRetryTimer);
+
+    libraryFlush = (async () => {
+        try {
+            let pending = readPendingLibraryChanges();
+            while (pending.length > 0) {
+                const since = Number(localStorage.getItem('libraryVersion') || 0);
+                const body = JSON.stringify({ ...pending[0], since: since });
+                try {
+                    applyLibraryChanges(await libraryRequest('/api/library/sync', {
+                        method: 'POST',
+                        body: body,
+                        // Let the request finish if the page unloads right after; browsers cap keepalive bodies at 64 KB
+                        keepalive: body.length < 60000
+                    }));
+                } catch (error) {
+                    // A rejected delta would fail the same way on every retry, so drop it
+                    if (!(error.status >= 400 && error.status < 500 && error.status !== 408 && error.status !== 429)) {
+                        throw error;
+                    }
+                    console.error('Dropping rejected library change:', error);
+                }
+                // Re-read, since more changes may have been queued meanwhile
+                pending = readPendingLibraryChanges().slice(1);
+                localStorage.setItem('libraryPending', JSON.stringify(pending));
+            }
+
+            const since = Number(localStorage.getItem('libraryVersion') || 0);
+            applyLibraryChanges(await libraryRequest(`/api/library?since=${since}`));
+        } catch (error) {
+            console.error('Error syncing library, will retry:', error);
+            libraryRetryTimer = setTimeout(flushLibraryChanges, LIBRARY_RETRY_MS);
+        } finally {
+            libraryFlush = null;
+        }
+    })();
+    return libraryFlush;
+}
+
+// Queue a library saved before server sync existed, once per browser
+if (!localStorage.getItem('librarySynced')) {
+    const savedLibrary = readLibrary();
+    if (savedLibrary.length > 0) {
+        const pending = readPendingLibraryChanges();
+        pending.unshift({ added: savedLibrary.slice(0, 500) });
+        localStorage.setItem('libraryPending', JSON.stringify(pending));
+    }
+    localStorage.setItem('librarySynced', 'true');
+}
+
+window.addEventListener('online', flushLibraryChanges);
+flushLibraryChanges();
+
+// Same as the server's normalize_text: strip accents and punctuation, lowercase, collapse whitespace
+function normalizeText(text) {
+    return (text || '')
+        .normalize('NFKD')
+        .replace(/\p{Mn}/gu, '')
+        .toLowerCase()
+        .replace(/[^a-z0-9]+/g, ' ')
+        .trim();
+}
+
+function libraryBookId(book) {
+    return book.google_books_id || `title:${normalizeText(book.title)}`;
+}
+
 function addToLibrary(book) {
-    let library = JSON.parse(localStorage.getItem('library')) || [];
+    let library = readLibrary();
     
     // Check if book is already in library
     const exists = library.some(existingBook => existingBook.title === book.title);
@@ -260,15 +518,18 @@ function addToLibrary(book) {
     
     library.push(book);
     localStorage.setItem('library', JSON.stringify(library));
+    syncLibraryChange({ added: [book] });
     alert(`Added "${book.title}" to your library!`);
 }
 
 function removeFromLibrary(title) {
-    let library = JSON.parse(localStorage.getItem('library')) || [];
+    let library = readLibrary();
+    const removed = library.filter(book => book.title === title).map(libraryBookId);
     library = library.filter(book => book.title !== title);
     localStorage.setItem('library', JSON.stringify(library));
+    syncLibraryChange({ removed: removed });
     alert(`Removed "${title}" from your library.`);
-    location.reload();
+    renderLibrary();
 }
 
 // Global functions for sidebar community features
@@ -383,38 +644,43 @@ function hideLoadingState() {
     }
 }
 
+// Render the library page from the local copy; does nothing on other pages
+function renderLibrary() {
+    const librarySection = document.getElementById('library-section');
+    if (!librarySection) {
+        return;
+    }
+    const library = readLibrary();
+    
+    if (library.length === 0) {
+        librarySection.innerHTML = '<p>No books in your library. Add some books from the recommendations!</p>';
+    } else {
+        librarySection.innerHTML = library.map(book => {
+            const placeholder = 'https://via.placeholder.com/80x120/cccccc/666666?text=No+Cover';
+            const thumbnail = coverUrl(book, placeholder);
+            const rating = book.average_rating ? `⭐ ${book.average_rating}/5` : 'No rating';
+            const publishedYear = book.published_date ? book.published_date.split('-')[0] : 'Unknown';
+            
+            return `
+                <div class="library-book">
+                    <div class="book-image" style="text-align: center; margin-bottom: 1rem;">
+                        <img src="${thumbnail}" alt="${book.title}" style="max-width: 80px; height: auto; border-radius: 6px;" onerror="this.onerror=null; this.src='${placeholder}'">
+                    </div>
+                    <h3>${book.title}</h3>
+                    <p>by ${book.author_string || 'Unknown Author'}</p>
+                    <p style="color: var(--text-muted); font-size: 0.9rem;">Published: ${publishedYear}</p>
+                    <p style="color: var(--text-muted); font-size: 0.9rem;">${rating}</p>
+                    <button onclick='removeFromLibrary("${book.title.replace(/'/g, "\\'")}")'>
+                        🗑️ Remove from Library
+                    </button>
+                </div>`;
+        }).join('');
+    }
+}
+
 // Load library on library page
 if (window.location.pathname.includes('Library.html') || window.location.pathname.includes('/library')) {
-    document.addEventListener('DOMContentLoaded', function() {
-        const librarySection = document.getElementById('library-section');
-        if (librarySection) {
-            let library = JSON.parse(localStorage.getItem('library')) || [];
-            
-            if (library.length === 0) {
-                librarySection.innerHTML = '<p>No books in your library. Add some books from the recommendations!</p>';
-            } else {
-                librarySection.innerHTML = library.map(book => {
-                    const thumbnail = book.thumbnail || 'https://via.placeholder.com/80x120/cccccc/666666?text=No+Cover';
-                    const rating = book.average_rating ? `⭐ ${book.average_rating}/5` : 'No rating';
-                    const publishedYear = book.published_date ? book.published_date.split('-')[0] : 'Unknown';
-                    
-                    return `
-                        <div class="library-book">
-                            <div class="book-image" style="text-align: center; margin-bottom: 1rem;">
-                                <img src="${thumbnail}" alt="${book.title}" style="max-width: 80px; height: auto; border-radius: 6px;">
-                            </div>
-                            <h3>${book.title}</h3>
-                            <p>by ${book.author_string || 'Unknown Author'}</p>
-                            <p style="color: var(--text-muted); font-size: 0.9rem;">Published: ${publishedYear}</p>
-                            <p style="color: var(--text-muted); font-size: 0.9rem;">${rating}</p>
-                            <button onclick='removeFromLibrary("${book.title.replace(/'/g, "\\'")}")'>
-                                🗑️ Remove from Library
-                            </button>
-                        </div>`;
-                }).join('');
-            }
-        }
-    });
+    document.addEventListener('DOMContentLoaded', renderLibrary);
 }
 
 // Load trending books page function
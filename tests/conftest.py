@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The recommender refuses to start without a key; tests never reach the real model
+os.environ.setdefault('GEMINI_API_KEY', 'test-key')
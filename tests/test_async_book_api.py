@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import pytest
+from utils.async_book_api import AsyncGoogleBooksAPI
+from utils.book_api import GoogleBooksAPI
+from utils.cache import LRUCache, SQLiteCache, TieredCache
+from utils.text import make_book_key
+
+BOOK = {'title': 'Circe', 'authors': ['Madeline Miller'], 'google_books_id': 'circe', 'isbns': []}
+
+class RecordingDisk(SQLiteCache):
+    """SQLite tier that records which threads touch it"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get_entry(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get_entry(key)
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        self.threads.add(threading.get_ident())
+        super().set(key, value, ttl=ttl, expires_at=expires_at)
+
+class RecordingCatalog:
+    def __init__(self):
+        self.threads = set()
+
+    def lookup(self, title, author=None):
+        self.threads.add(threading.get_ident())
+        return None
+
+    def add(self, book, query_title=None, query_author=None):
+        self.threads.add(threading.get_ident())
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    memory = LRUCache(maxsize=16)
+    disk = RecordingDisk(str(tmp_path / 'books.sqlite3'))
+    books_api = GoogleBooksAPI(cache=TieredCache(memory, disk), catalog=RecordingCatalog())
+    return AsyncGoogleBooksAPI(books_api)
+
+def test_disk_tier_and_catalog_are_read_off_the_loop(client):
+    memory, disk = client.books_api.cache.tiers
+    disk.set('book:' + make_book_key('Circe'), BOOK)
+    disk.threads.clear()
+
+    async def search():
+        loop_thread = threading.get_ident()
+        return loop_thread, await client.search_book('Circe')
+
+    loop_thread, book_info = asyncio.run(search())
+    assert book_info == BOOK
+    assert disk.threads and loop_thread not in disk.threads
+    assert client.books_api.catalog.threads and loop_thread not in client.books_api.catalog.threads
+    # The disk hit is promoted so the next read stays on the loop
+    assert memory.get('book:' + make_book_key('Circe')) == BOOK
+
+def test_loaded_values_are_stored_off_the_loop(client):
+    _, disk = client.books_api.cache.tiers
+
+    async def load():
+        async def loader():
+            return BOOK
+        return threading.get_ident(), await client._cached_async('volume:circe', loader)
+
+    loop_thread, value = asyncio.run(load())
+    assert value == BOOK
+    assert disk.threads and loop_thread not in disk.threads
+    assert disk.get('volume:circe') == BOOK
+
+class Model:
+    """Answers every prompt with the same two JSON Lines recommendations"""
+
+    def __init__(self, titles):
+        self.titles = titles
+
+    def generate_content(self, prompt, stream=False):
+        return Chunk('\n'.join(f'{{"title": "{title}"}}' for title in self.titles))
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+def test_engine_survives_a_new_event_loop(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeBooksServer
+    from book_recommendation_engine import BookRecommendationEngine
+
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('BOOKAI_LLM_HEDGE_AFTER', '0')
+    with FakeBooksServer() as server:
+        monkeypatch.setenv('BOOKAI_BOOKS_BASE_URL', server.base_url)
+        engine = BookRecommendationEngine()
+
+        for run, genre in enumerate(('Mystery', 'Fantasy')):
+            engine.ai_recommender.model = Model([f"{genre} Novel One", f"{genre} Novel Two"])
+            result = asyncio.run(engine.get_recommendations_async({'genres': [genre]}))
+            assert result['success']
+            assert not any(book.get('placeholder') for book in result['recommendations'])
+        assert server.stats()['requests'] >= 4
+
+def test_local_errors_do_not_open_the_shared_circuit(client, monkeypatch):
+    class BrokenHTTP:
+        def get(self, url, params=None):
+            raise RuntimeError("bug in the caller")
+
+    breaker = client.books_api.circuit_breaker
+    monkeypatch.setattr(client, '_get_http', lambda: BrokenHTTP())
+    client._semaphore = asyncio.Semaphore(1)
+
+    for _ in range(breaker.failure_threshold + 1):
+        with pytest.raises(RuntimeError):
+            asyncio.run(client._request_async({'q': 'x'}))
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
+
+def test_async_engine_leaves_out_owned_books(tmp_path, monkeypatch):
+    from benchmarks.fakes import FakeBooksServer
+    from book_recommendation_engine import BookRecommendationEngine
+
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('BOOKAI_LLM_HEDGE_AFTER', '0')
+    with FakeBooksServer() as server:
+        monkeypatch.setenv('BOOKAI_BOOKS_BASE_URL', server.base_url)
+        engine = BookRecommendationEngine()
+        engine.ai_recommender.model = Model(['Owned Novel', 'Second Novel', 'Third Novel'])
+
+        preferences = {'genres': ['Mystery'], 'owned_books': ['owned novel']}
+        result = asyncio.run(engine.get_recommendations_async(preferences, top_k=2))
+
+    assert result['success']
+    titles = [book['ai_recommended_title'] for book in result['recommendations']]
+    assert titles == ['Second Novel', 'Third Novel']
+
+def test_model_cache_disk_tier_is_used_off_the_loop(tmp_path, monkeypatch):
+    from book_recommendation_engine import BookRecommendationEngine
+
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('BOOKAI_LLM_HEDGE_AFTER', '0')
+    engine = BookRecommendationEngine()
+    recommender = engine.ai_recommender
+    recommender.model = Model(['Circe'])
+    disk = RecordingDisk(str(tmp_path / 'llm.sqlite3'))
+    recommender.response_cache = TieredCache(LRUCache(maxsize=16), disk)
+    ai_recommender, _ = engine._get_async_clients()
+
+    async def generate():
+        return threading.get_ident(), await ai_recommender.generate_recommendations({'genres': ['Myth']})
+
+    loop_thread, titles = asyncio.run(generate())
+    assert titles == ['Circe']
+    assert disk.threads and loop_thread not in disk.threads
@@ -0,0 +1,60 @@
+import pytest
+import requests
+from utils.cache import MISSING
+from utils.cover_cache import CoverCache
+
+class Response:
+    def __init__(self, content, content_type='image/jpeg'):
+        self.content = content
+        self.headers = {'Content-Type': content_type}
+
+    def raise_for_status(self):
+        pass
+
+class Session:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return Response(b'jpeg bytes')
+
+class BooksAPI:
+    """Stand-in for GoogleBooksAPI with scripted volume lookups"""
+
+    timeout = 1
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.session = Session()
+
+    def fetch_book_by_id(self, volume_id):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+@pytest.fixture
+def make_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    return lambda *results: CoverCache(BooksAPI(*results))
+
+def test_caches_a_fetched_cover(make_cache):
+    covers = make_cache({'thumbnail': 'https://books.example/cover.jpg'})
+    path, digest, content_type = covers.get('vol1')
+    with open(path, 'rb') as f:
+        assert f.read() == b'jpeg bytes'
+    assert content_type == 'image/jpeg'
+    assert covers.get('vol1') == (path, digest, content_type)
+    assert covers.books_api.session.calls == 1
+
+def test_volume_without_thumbnail_is_negative_cached(make_cache):
+    covers = make_cache({'thumbnail': ''})
+    assert covers.get('vol1') is None
+    assert covers.index.get('cover:vol1') is None
+
+def test_lookup_errors_are_not_negative_cached(make_cache):
+    covers = make_cache(requests.ConnectionError('down'), {'thumbnail': 'https://books.example/cover.jpg'})
+    assert covers.get('vol1') is None
+    assert covers.index.get('cover:vol1') is MISSING
+    assert covers.get('vol1') is not None
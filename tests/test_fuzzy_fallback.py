@@ -0,0 +1,51 @@
+import pytest
+from utils.book_api import GoogleBooksAPI
+from utils.cache import LRUCache
+from utils.catalog import BookCatalog
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    catalog = BookCatalog(str(tmp_path / 'catalog.sqlite3'))
+    catalog.add({'title': 'The Shining', 'authors': ['Stephen King'], 'google_books_id': 'king'})
+    catalog.add({'title': 'The Shinning', 'authors': ['Jane Parody'], 'google_books_id': 'parody'})
+    return GoogleBooksAPI(cache=LRUCache(maxsize=16), catalog=catalog)
+
+def test_fuzzy_match_without_author_takes_closest_title(api):
+    assert api._fuzzy_match('The Shinning')['google_books_id'] == 'parody'
+
+def test_fuzzy_match_uses_author(api):
+    assert api._fuzzy_match('The Shinning', 'Stephen King')['google_books_id'] == 'king'
+
+def test_fallback_lookup_passes_author(api):
+    assert api._fallback_lookup('The Shinning', 'Stephen King')['google_books_id'] == 'king'
+
+class FallbackOnlySession:
+    """Exact title searches find nothing; the broader fallback query finds Silent Spring"""
+
+    def get(self, url, params=None, timeout=None):
+        items = []
+        if not params['q'].startswith('intitle:'):
+            items = [{'id': 'spring', 'volumeInfo': {'title': 'Silent Spring', 'authors': ['Rachel Carson']}}]
+        return Response({'items': items})
+
+class Response:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+def test_fallback_matches_are_not_cataloged_under_the_query(api):
+    api.session = FallbackOnlySession()
+    assert api.search_book('The Silent Patient')['google_books_id'] == 'spring'
+
+    api.cache.clear()
+    assert api.catalog.lookup('The Silent Patient') is None
+    assert api.catalog.lookup('Silent Spring')['google_books_id'] == 'spring'
@@ -0,0 +1,33 @@
+import pytest
+from utils.library_store import LibraryStore, clean_book
+
+@pytest.fixture
+def store(tmp_path):
+    return LibraryStore(str(tmp_path / 'library.sqlite3'))
+
+def test_clean_book_normalizes_list_fields():
+    book = clean_book({'title': 'Circe', 'authors': 'Madeline Miller', 'categories': ['Fiction', 3, ' ']})
+    assert book['authors'] == ['Madeline Miller']
+    assert book['categories'] == ['Fiction']
+
+@pytest.mark.parametrize('book', [None, 'Circe', {'title': ''}, {'title': 42}, {'authors': ['Someone']}])
+def test_clean_book_rejects_books_without_a_title(book):
+    assert clean_book(book) is None
+
+def test_profile_counts_whole_author_names(store):
+    store.add_many('reader', [
+        {'title': 'Circe', 'authors': 'Madeline Miller', 'categories': 'Fiction'},
+        {'title': 'The Song of Achilles', 'authors': ['Madeline Miller'], 'categories': 7},
+        {'title': 42, 'authors': ['Nobody']}
+    ])
+    profile = store.profile('reader')
+    assert profile['titles'] == ['Circe', 'The Song of Achilles']
+    assert profile['authors'] == ['Madeline Miller']
+    assert profile['genres'] == ['Fiction']
+
+def test_changes_since_reports_removals(store):
+    version = store.add_many('reader', [{'title': 'Circe', 'google_books_id': 'circe'}])
+    store.remove_many('reader', ['circe'])
+    changes = store.changes_since('reader', version)
+    assert changes['removed'] == ['circe']
+    assert changes['books'] == []
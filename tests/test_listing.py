@@ -0,0 +1,38 @@
+import pytest
+from utils.listing import CARD_FIELDS, list_page, parse_list_params
+
+BOOKS = [{'title': f"Book {n}", 'description': 'Long text', 'trending_rank': n} for n in range(1, 6)]
+
+def test_parse_defaults():
+    assert parse_list_params({}) == (None, 0, None)
+
+def test_parse_caps_limit():
+    assert parse_list_params({'limit': '1000'})[0] == 100
+
+@pytest.mark.parametrize('args', [{'limit': '0'}, {'limit': '-1'}, {'offset': '-1'}, {'limit': 'ten'}])
+def test_parse_rejects_bad_values(args):
+    with pytest.raises(ValueError):
+        parse_list_params(args)
+
+def test_parse_card_fields():
+    fields = parse_list_params({'fields': 'card,description'})[2]
+    assert set(CARD_FIELDS) <= fields
+    assert 'description' in fields
+    assert 'trending_rank' in fields
+
+def test_pages_until_exhausted():
+    offset, titles = 0, []
+    while offset is not None:
+        page = list_page(BOOKS, limit=2, offset=offset)
+        titles += [book['title'] for book in page['books']]
+        offset = page['next_offset']
+    assert titles == [book['title'] for book in BOOKS]
+
+def test_empty_page_ends_paging():
+    assert list_page(BOOKS, limit=0, offset=2)['next_offset'] is None
+    assert list_page(BOOKS, limit=2, offset=10)['next_offset'] is None
+
+def test_projects_fields():
+    page = list_page(BOOKS, limit=1, fields={'title'})
+    assert page['books'] == [{'title': 'Book 1'}]
+    assert page['total_found'] == 5
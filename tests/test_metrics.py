@@ -0,0 +1,16 @@
+from utils.metrics import Registry, single_flight_collector
+from utils.single_flight import SingleFlight
+
+def test_single_flight_collector_exports_each_group():
+    engine, covers = SingleFlight(), SingleFlight()
+    engine.do('key', lambda: 1)
+    engine.collapsed = 3
+    registry = Registry()
+    registry.register_collector(single_flight_collector({'engine': engine, 'covers': covers}))
+
+    lines = registry.render().splitlines()
+    assert 'bookai_single_flight_calls_total{group="engine"} 1' in lines
+    assert 'bookai_single_flight_collapsed_total{group="engine"} 3' in lines
+    assert 'bookai_single_flight_calls_total{group="covers"} 0' in lines
+    assert 'bookai_single_flight_in_flight{group="engine"} 0' in lines
+    assert '# TYPE bookai_single_flight_in_flight gauge' in lines
@@ -0,0 +1,72 @@
+import pytest
+from utils.ai_recommender import BookRecommender
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class StreamingModel:
+    """Streams a fixed response in small pieces"""
+
+    def __init__(self, text, size=7):
+        self.text = text
+        self.size = size
+
+    def generate_content(self, prompt, stream=False):
+        if not stream:
+            return Chunk(self.text)
+        return (Chunk(self.text[i:i + self.size]) for i in range(0, len(self.text), self.size))
+
+@pytest.fixture
+def recommender(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    return BookRecommender(disk_cache=False, hedge_after=0)
+
+PRETTY_FENCED = '''```json
+[
+  {
+    "title": "Gone Girl",
+    "author": "Gillian Flynn"
+  },
+  {
+    "title": "Sharp Objects",
+    "author": "Gillian Flynn"
+  }
+]
+```'''
+
+ONE_LINE_FENCED = '```json\n[{"title": "Gone Girl", "author": "Gillian Flynn"}, {"title": "In the Woods", "author": "Tana French"}]\n```'
+
+JSON_LINES = '{"title": "Gone Girl", "author": "Gillian Flynn"}\n{"title": "In the Woods", "author": "Tana French", "isbn": "978-0-670-03860-2"}'
+
+@pytest.mark.parametrize('response, expected', [
+    (PRETTY_FENCED, ['Gone Girl', 'Sharp Objects']),
+    (ONE_LINE_FENCED, ['Gone Girl', 'In the Woods']),
+    (JSON_LINES, ['Gone Girl', 'In the Woods']),
+    ('[{"title": "Gone Girl"}, "Sharp Objects"]', ['Gone Girl', 'Sharp Objects']),
+    ('Here you go:\n{"recommendations": [{"title": "Gone Girl"}]}\nEnjoy!', ['Gone Girl']),
+    ('1. Gone Girl\n2. Sharp Objects', ['Gone Girl', 'Sharp Objects']),
+])
+def test_parse_recommendations(recommender, response, expected):
+    assert recommender._parse_recommendations(response, limit=5) == expected
+
+def test_parse_keeps_author_and_isbn(recommender):
+    titles = recommender._parse_recommendations(JSON_LINES, limit=5)
+    assert titles[0].author == 'Gillian Flynn'
+    assert titles[1].isbn == '9780670038602'
+
+def test_parse_respects_limit(recommender):
+    assert recommender._parse_recommendations(PRETTY_FENCED, limit=1) == ['Gone Girl']
+
+def test_truncated_document_yields_no_fragments(recommender):
+    truncated = PRETTY_FENCED.split('"author": "Gillian Flynn"\n  },')[0]
+    assert recommender._parse_recommendations(truncated, limit=5) == []
+
+@pytest.mark.parametrize('response, expected', [
+    (PRETTY_FENCED, ['Gone Girl', 'Sharp Objects']),
+    (ONE_LINE_FENCED, ['Gone Girl', 'In the Woods']),
+    (JSON_LINES, ['Gone Girl', 'In the Woods']),
+])
+def test_stream_recommendations(recommender, response, expected):
+    recommender.model = StreamingModel(response)
+    assert list(recommender.stream_recommendations({'genres': ['Mystery']}, limit=5)) == expected
@@ -0,0 +1,135 @@
+import pytest
+import requests
+from utils import resilience
+from utils.book_api import GoogleBooksAPI
+from utils.cache import LRUCache
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, 'monotonic', clock.monotonic)
+    return clock
+
+def test_opens_after_threshold(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+
+def test_single_probe_after_reset_timeout(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+def test_probe_success_closes(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+    assert breaker.allow()
+
+def test_probe_failure_reopens(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+def test_lost_probe_is_replaced(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    # The probe never reports back
+    clock.now += 29
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+class BrokenSession:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+def test_unexpected_request_error_settles_probe(clock, monkeypatch, tmp_path):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    breaker = CircuitBreaker('books', failure_threshold=1, reset_timeout=30)
+    api = GoogleBooksAPI(cache=LRUCache(maxsize=16), circuit_breaker=breaker,
+                         retry_policy=RetryPolicy(max_retries=0))
+    api.session = BrokenSession()
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        api._request({'q': 'x'})
+    assert breaker.state == 'open'
+
+    clock.now += 30
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        api._request({'q': 'x'})
+    assert breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError):
+        api._request({'q': 'x'})
+    assert api.session.calls == 2
+
+def test_release_gives_back_the_probe(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.release()
+    assert breaker.failures == 1
+    assert breaker.allow()
+
+def test_release_when_closed_changes_nothing(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2)
+    breaker.record_failure()
+    breaker.release()
+    assert breaker.state == 'closed'
+    assert breaker.failures == 1
+
+class FaultySession:
+    def get(self, url, params=None, timeout=None):
+        raise RuntimeError("bug in the caller")
+
+def test_local_errors_do_not_open_the_circuit(clock, monkeypatch, tmp_path):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    breaker = CircuitBreaker('books', failure_threshold=2, reset_timeout=30)
+    api = GoogleBooksAPI(cache=LRUCache(maxsize=16), circuit_breaker=breaker)
+    api.session = FaultySession()
+
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            api._request({'q': 'x'})
+    assert breaker.state == 'closed'
+    assert breaker.failures == 0
@@ -0,0 +1,21 @@
+import pytest
+from utils.scoring import PreferenceScorer
+
+PREFERENCES = {'genres': ['Fantasy', 'Mystery'], 'favorite_authors': ['Ursula K. Le Guin']}
+
+BOOKS = [
+    {'title': 'Unrated', 'categories': []},
+    {'title': 'Int rating', 'categories': ['Fiction / Fantasy'], 'average_rating': 4, 'ratings_count': 2000},
+    {'title': 'Float rating', 'categories': ['Mystery'], 'average_rating': 3.5, 'ratings_count': 20000},
+    {'title': 'Clamped', 'categories': ['Fantasy', 'Mystery'], 'average_rating': 5.0, 'ratings_count': 50000},
+    {'title': 'Low', 'categories': ['Cooking'], 'average_rating': 1.0},
+    {'title': 'Missing counts', 'categories': None, 'average_rating': None, 'ratings_count': None},
+]
+
+@pytest.mark.parametrize('book', BOOKS, ids=[book['title'] for book in BOOKS])
+def test_single_book_score_matches_the_batch(book):
+    scorer = PreferenceScorer(PREFERENCES)
+    expected = scorer.score_batch([book])[0]
+    actual = scorer.score(book)
+    assert actual == expected
+    assert type(actual[0]) is type(expected[0])
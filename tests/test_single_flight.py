@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from utils.ai_recommender import BookRecommender
+from utils.single_flight import SingleFlight
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+class SlowStreamingModel:
+    """Streams a fixed response line by line, counting calls"""
+
+    def __init__(self, text, delay=0.02):
+        self.text = text
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+        return self._chunks()
+
+    def _chunks(self):
+        for line in self.text.splitlines(keepends=True):
+            time.sleep(self.delay)
+            yield Chunk(line)
+
+def test_do_collapses_concurrent_calls():
+    group = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def work():
+        started.set()
+        release.wait()
+        return 'result'
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        leader = executor.submit(group.do, 'key', work)
+        started.wait()
+        followers = [executor.submit(group.do, 'key', work) for _ in range(3)]
+        while group.collapsed < 3:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == ['result'] * 4
+    assert group.stats() == {'calls': 1, 'collapsed': 3, 'in_flight': 0}
+
+def test_stream_replays_items_to_late_readers():
+    group = SingleFlight()
+    halfway = threading.Event()
+    release = threading.Event()
+
+    def produce(publish):
+        publish('a')
+        publish('b')
+        halfway.set()
+        release.wait()
+        publish('c')
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        first = group.stream('key', produce, executor)
+        halfway.wait()
+        second = group.stream('key', produce, executor)
+        release.set()
+        assert list(first.read()) == ['a', 'b', 'c']
+        assert list(second.read()) == ['a', 'b', 'c']
+    assert second is first
+    assert group.stats() == {'calls': 1, 'collapsed': 1, 'in_flight': 0}
+
+def test_stream_error_reaches_every_reader():
+    group = SingleFlight()
+
+    def produce(publish):
+        publish('a')
+        raise ValueError('broken')
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        shared = group.stream('key', produce, executor)
+        for _ in range(2):
+            items = []
+            with pytest.raises(ValueError):
+                for item in shared.read():
+                    items.append(item)
+            assert items == ['a']
+
+def test_stream_read_times_out():
+    group = SingleFlight()
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        shared = group.stream('key', lambda publish: release.wait(), executor)
+        with pytest.raises(TimeoutError):
+            list(shared.read(deadline=time.monotonic() + 0.01))
+        release.set()
+
+def test_concurrent_identical_streams_share_one_model_call(tmp_path, monkeypatch):
+    monkeypatch.setenv('BOOKAI_CACHE_DIR', str(tmp_path))
+    recommender = BookRecommender(disk_cache=False, hedge_after=0)
+    recommender.model = SlowStreamingModel('{"title": "Gone Girl"}\n{"title": "In the Woods"}\n')
+    preferences = {'genres': ['Mystery']}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: list(recommender.stream_recommendations(preferences, limit=5)),
+                                    range(8)))
+
+    assert results == [['Gone Girl', 'In the Woods']] * 8
+    assert recommender.model.calls == 1
@@ -0,0 +1,79 @@
+import time
+from utils import snapshots
+from utils.snapshots import DegradedSnapshotError, SnapshotRefresher
+
+class Builder:
+    def __init__(self, *results):
+        self.results = list(results)
+
+    def __call__(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def test_failed_rebuild_keeps_last_snapshot():
+    refresher = SnapshotRefresher('test', Builder(['good'], RuntimeError('down')))
+    assert refresher.refresh()
+    assert not refresher.refresh()
+    assert refresher.get().data == ['good']
+    assert refresher.status()['last_error'] == 'down'
+
+def test_degraded_rebuild_keeps_good_snapshot():
+    refresher = SnapshotRefresher('test', Builder(['good'], DegradedSnapshotError('fallback', ['degraded'])))
+    refresher.refresh()
+    version = refresher.get().version
+    assert not refresher.refresh()
+    assert refresher.get().data == ['good']
+    assert refresher.get().version == version
+    assert refresher.status()['last_error'] == 'fallback'
+
+def test_degraded_build_served_until_a_good_one():
+    refresher = SnapshotRefresher('test', Builder(DegradedSnapshotError('fallback', ['degraded']), ['good']))
+    assert refresher.get().data == ['degraded']
+    assert refresher.refresh()
+    assert refresher.get().data == ['good']
+    assert refresher.status()['last_error'] is None
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def wait_for(condition, timeout=2):
+    # perf_counter, since the tests replace time.monotonic
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+def test_reads_wait_retry_interval_after_a_failed_rebuild(monkeypatch):
+    clock = Clock()
+    builder = Builder(['good'], RuntimeError('down'), ['fresh'])
+    refresher = SnapshotRefresher('test', builder, retry_interval=60, stale_after=0)
+    refresher.refresh()
+    monkeypatch.setattr(snapshots.time, 'monotonic', clock.monotonic)
+    refresher.refresh()
+
+    for _ in range(5):
+        assert refresher.get().data == ['good']
+    assert builder.results == [['fresh']]
+
+    clock.now += 60
+    refresher.get()
+    wait_for(lambda: refresher.get().data == ['fresh'])
+
+def test_missing_snapshot_is_not_rebuilt_on_every_read(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(snapshots.time, 'monotonic', clock.monotonic)
+    builder = Builder(RuntimeError('down'), ['good'])
+    refresher = SnapshotRefresher('test', builder, retry_interval=60)
+
+    assert refresher.get() is None
+    assert refresher.get() is None
+    assert builder.results == [['good']]
+
+    clock.now += 60
+    assert refresher.get().data == ['good']
@@ -1,95 +1,549 @@
 import os
+import hashlib
+import json
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 import google.generativeai as genai
+from utils.cache import MISSING, LRUCache, SQLiteCache, TieredCache, get_cache_dir
+from utils.metrics import LLM_OUTCOMES, LLM_REQUEST_SECONDS
+from utils.preference_cache import PreferenceCache, canonicalize_preferences
+from utils.single_flight import SingleFlight
+from utils.text import normalize_isbn, normalize_text
+from utils.tracing import propagate, span
 
 load_dotenv()
 
+_WHITESPACE = re.compile(r'\s+')
+_JSON_OBJECT = re.compile(r'\{.*\}')
+_LIST_PREFIX = re.compile(r'^(?:\d+\.\s*)?(?:[•\-\*]\s*)?')
+_CODE_FENCE = re.compile(r'^\s*```[\w-]*\s*$', re.MULTILINE)
+# Lines of a pretty-printed JSON document that hold no title of their own: brackets, "key": value pairs
+_JSON_FRAGMENT = re.compile(r'^(?:[\[\]{},]+|"[^"]*"\s*:.*)$')
+
+class BookTitle(str):
+    """A recommended title that also carries the author and ISBN the model gave, if any"""
+    
+    def __new__(cls, title, author=None, isbn=None):
+        book_title = super().__new__(cls, title)
+        book_title.author = author
+        book_title.isbn = isbn
+        return book_title
+
 class BookRecommender:
-    def __init__(self):
-        """Initialize the AI book recommender"""
+    MODEL_NAME = 'models/gemini-1.5-flash'
+    
+    # Response cache lifetimes per prompt type, in seconds
+    CACHE_TTLS = {
+        'recommendations': 3600,
+        'trending': 6 * 3600,
+        'top_rated': 24 * 3600
+    }
+    
+    # Seconds a caller waits for the model per prompt type before using the fallback;
+    # trending and top-rated are built in the background, so they can wait longer
+    LATENCY_BUDGETS = {
+        'recommendations': 10,
+        'trending': 30,
+        'top_rated': 30
+    }
+    
+    # Similarity accepted when the model failed or ran out of time, before the static fallback
+    FALLBACK_SIMILARITY = 0.5
+    
+    def __init__(self, cache_size=512, disk_cache=None, single_flight=None, hedge_after=None,
+                 latency_budgets=None, max_model_calls=16, preference_cache=None):
+        """
+        Initialize the AI book recommender
+        
+        Args:
+            cache_size (int): Number of responses kept in the in-process LRU
+            disk_cache (bool, optional): Also persist responses to SQLite; defaults to
+                the BOOKAI_LLM_DISK_CACHE environment variable
+            single_flight (SingleFlight, optional): Coalesces identical in-flight model calls
+            hedge_after (float, optional): Seconds after which a slow model call gets a
+                second, identical request and the first answer wins; defaults to the
+                BOOKAI_LLM_HEDGE_AFTER environment variable or 4 seconds, 0 disables hedging;
+                streamed recommendations are not hedged
+            latency_budgets (dict, optional): Overrides for LATENCY_BUDGETS
+            max_model_calls (int): Maximum number of concurrent model requests
+            preference_cache (PreferenceCache, optional): Serves recommendations made for
+                a near-identical preference set without calling the model
+        """
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
         
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('models/gemini-1.5-flash')
+        self.model_name = self.MODEL_NAME
+        self.model = genai.GenerativeModel(self.model_name)
+        
+        if disk_cache is None:
+            disk_cache = os.getenv('BOOKAI_LLM_DISK_CACHE', '').lower() in ('1', 'true', 'yes')
+        
+        disk = None
+        if disk_cache:
+            try:
+                disk = SQLiteCache(os.path.join(get_cache_dir(), 'llm.sqlite3'),
+                                   ttl=max(self.CACHE_TTLS.values()), max_entries=5000)
+            except Exception as e:
+                print(f"LLM disk cache unavailable, using memory only: {e}")
+        
+        self.response_cache = TieredCache(LRUCache(maxsize=cache_size), disk)
+        self.single_flight = single_flight or SingleFlight()
+        
+        if hedge_after is None:
+            hedge_after = float(os.getenv('BOOKAI_LLM_HEDGE_AFTER', '4'))
+        self.hedge_after = hedge_after or None
+        self.latency_budgets = dict(self.LATENCY_BUDGETS, **(latency_budgets or {}))
+        # Model calls run here so callers can stop waiting at their deadline
+        self._model_executor = ThreadPoolExecutor(max_workers=max_model_calls, thread_name_prefix='llm')
+        self.preference_cache = preference_cache or PreferenceCache(ttl=self.CACHE_TTLS['recommendations'])
+    
+    def _cache_key(self, prompt):
+        """Key a prompt by model name and its whitespace-canonicalized text"""
+        canonical = _WHITESPACE.sub(' ', prompt).strip()
+        digest = hashlib.sha256(f"{self.model_name}\n{canonical}".encode('utf-8')).hexdigest()
+        return f"llm:{digest}"
     
-    def generate_recommendations(self, user_preferences):
+    def _generate(self, prompt, prompt_type):
+        """
+        Return the model's response text for a prompt, serving repeats from the cache
+        
+        Args:
+            prompt (str): Prompt to send to the model
+            prompt_type (str): One of CACHE_TTLS, selects the cache lifetime and latency budget
+        
+        Returns:
+            str: Response text
+        
+        Raises:
+            TimeoutError: If no answer arrived within the prompt type's latency budget
+        """
+        key = self._cache_key(prompt)
+        with span('llm', prompt_type=prompt_type) as attributes:
+            text = self.response_cache.get(key)
+            attributes['cached'] = text is not MISSING
+            if text is not MISSING:
+                return text
+            
+            budget = self.latency_budgets.get(prompt_type)
+            deadline = time.monotonic() + budget if budget else None
+            
+            # Identical prompts already in flight share one model call
+            return self.single_flight.do(
+                key, lambda: self._generate_hedged(prompt, prompt_type, key, deadline))
+    
+    def _generate_hedged(self, prompt, prompt_type, key, deadline=None):
+        """
+        Call the model, hedging a slow call with a second request, until the deadline
+        
+        Every answer is cached when it arrives, so one that lands after the caller
+        gave up still serves the next request for the same prompt.
+        """
+        def store(future):
+            if not future.cancelled() and future.exception() is None:
+                self.response_cache.set(key, future.result(), ttl=self.CACHE_TTLS.get(prompt_type))
+        
+        def call_model(attempt):
+            with LLM_REQUEST_SECONDS.time(prompt_type=prompt_type), span('llm.call', attempt=attempt):
+                return self.model.generate_content(prompt).text
+        
+        def submit():
+            future = self._model_executor.submit(propagate(call_model), len(submitted))
+            submitted.append(future)
+            future.add_done_callback(store)
+            return future
+        
+        submitted = []
+        pending = {submit()}
+        hedge_at = time.monotonic() + self.hedge_after if self.hedge_after else None
+        error = None
+        while pending:
+            wake_at = [t for t in (hedge_at, deadline) if t is not None]
+            timeout = max(0, min(wake_at) - time.monotonic()) if wake_at else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                if future.exception() is None:
+                    LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='ok')
+                    return future.result()
+                error = future.exception()
+            
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = None
+                if pending:
+                    LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='hedged')
+                    pending.add(submit())
+            if deadline is not None and now >= deadline and pending:
+                LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='timeout')
+                raise TimeoutError("Model did not answer within the latency budget")
+        
+        LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='error')
+        raise error
+    
+    def cache_stats(self):
+        """Return hit/miss counters for the response cache and collapsed in-flight calls"""
+        return {
+            'response_cache': self.response_cache.stats(),
+            'single_flight': self.single_flight.stats(),
+            'preference_cache': self.preference_cache.stats()
+        }
+    
+    def _similar_recommendations(self, user_preferences, count, threshold=None):
+        """Return titles recommended for a similar preference set, minus this user's favorite and owned books, or None"""
+        with span('llm.similar_match') as attributes:
+            titles = self.preference_cache.get(user_preferences, count, threshold)
+            attributes['hit'] = bool(titles)
+        if not titles:
+            return None
+        
+        favorites = {normalize_text(title) for title in
+                     user_preferences.get('favorite_books', []) + user_preferences.get('owned_books', [])}
+        return [title for title in titles if normalize_text(title) not in favorites] or None
+    
+    def generate_recommendations(self, user_preferences, count=5):
         """
         Generate book recommendations based on user preferences
         
         Args:
             user_preferences (dict): Contains 'genres', 'favorite_books', 'favorite_authors'
+            count (int): Number of books to ask for
         
         Returns:
             list: List of recommended book titles
         """
         # Create a detailed prompt for the AI
-        prompt = self._create_recommendation_prompt(user_preferences)
+        prompt = self._create_recommendation_prompt(user_preferences, count)
+        
+        text = self.response_cache.get(self._cache_key(prompt))
+        if text is not MISSING:
+            return self._parse_recommendations(text, count)
+        
+        similar = self._similar_recommendations(user_preferences, count)
+        if similar:
+            return similar
         
         try:
-            response = self.model.generate_content(prompt)
-            recommendations = self._parse_recommendations(response.text)
+            recommendations = self._parse_recommendations(self._generate(prompt, 'recommendations'), count)
+            self.preference_cache.set(user_preferences, count, recommendations)
             return recommendations
         except Exception as e:
             print(f"Error generating recommendations: {e}")
-            return self._get_fallback_recommendations(user_preferences)
+            return (self._similar_recommendations(user_preferences, count, self.FALLBACK_SIMILARITY)
+                    or self._get_fallback_recommendations(user_preferences))
+    
+    def stream_recommendations(self, user_preferences, limit=5):
+        """
+        Yield recommended titles while the model is still generating
+        
+        Each title is parsed as soon as its line completes, so callers can start
+        looking books up before the response is finished. Cached responses are
+        replayed immediately.
+        
+        Args:
+            user_preferences (dict): Contains 'genres', 'favorite_books', 'favorite_authors'
+            limit (int): Maximum number of titles to yield
+        
+        Yields:
+            str: Recommended book titles
+        """
+        prompt = self._create_recommendation_prompt(user_preferences, limit)
+        key = self._cache_key(prompt)
+        
+        text = self.response_cache.get(key)
+        if text is not MISSING:
+            yield from self._parse_recommendations(text, limit)
+            return
+        
+        similar = self._similar_recommendations(user_preferences, limit)
+        if similar:
+            yield from similar
+            return
+        
+        budget = self.latency_budgets.get('recommendations')
+        deadline = time.monotonic() + budget if budget else None
+        titles = []
+        buffer = ''
+        # Set once the response turns out to be one JSON document rather than JSON Lines
+        document = False
+        try:
+            for text in self._stream_chunks(prompt, key, deadline):
+                buffer += text
+                if document:
+                    continue
+                *lines, buffer = buffer.split('\n')
+                for index, line in enumerate(lines):
+                    if not titles and (line.strip().startswith('[') or line.strip() == '{'):
+                        # An array or pretty-printed object only parses once it is complete
+                        document = True
+                        buffer = '\n'.join(lines[index:] + [buffer])
+                        break
+                    with span('llm.parse'):
+                        title = self._parse_line(line)
+                    if title and len(titles) < limit:
+                        titles.append(title)
+                        yield title
+            
+            if document:
+                remaining = self._parse_recommendations(buffer, limit)
+            else:
+                with span('llm.parse'):
+                    remaining = [title for title in [self._parse_line(buffer)] if title]
+            for title in remaining[:limit - len(titles)]:
+                titles.append(title)
+                yield title
+        except Exception as e:
+            print(f"Error streaming recommendations: {e}")
+            if not titles:
+                yield from (self._similar_recommendations(user_preferences, limit, self.FALLBACK_SIMILARITY)
+                            or self._get_fallback_recommendations(user_preferences)[:limit])
+            return
+        
+        self.preference_cache.set(user_preferences, limit, titles)
     
-    def _create_recommendation_prompt(self, preferences):
+    def _stream_chunks(self, prompt, key, deadline=None):
+        """
+        Yield streamed response text until the stream ends or the deadline passes
+        
+        The stream is read on a model thread, which caches the full text once it
+        completes even if the caller stopped waiting. Identical prompts already
+        streaming share that call and replay its chunks from the start. Streams
+        aren't hedged; a slow one runs until the caller's deadline.
+        
+        Raises:
+            TimeoutError: If the deadline passed before the stream ended
+        """
+        def read_stream(publish):
+            parts = []
+            start = time.perf_counter()
+            with span('llm.stream') as attributes:
+                try:
+                    for chunk in self.model.generate_content(prompt, stream=True):
+                        if not parts:
+                            attributes['first_chunk_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                        parts.append(chunk.text)
+                        publish(chunk.text)
+                except Exception:
+                    LLM_OUTCOMES.inc(prompt_type='recommendations_stream', outcome='error')
+                    raise
+                finally:
+                    attributes['chunks'] = len(parts)
+                    LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, prompt_type='recommendations_stream')
+            LLM_OUTCOMES.inc(prompt_type='recommendations_stream', outcome='ok')
+            self.response_cache.set(key, ''.join(parts), ttl=self.CACHE_TTLS['recommendations'])
+        
+        stream = self.single_flight.stream(key, propagate(read_stream), self._model_executor)
+        try:
+            yield from stream.read(deadline)
+        except TimeoutError:
+            LLM_OUTCOMES.inc(prompt_type='recommendations_stream', outcome='timeout')
+            raise TimeoutError("Model did not finish streaming within the latency budget")
+    
+    def generate_recommendations_batch(self, preferences_list, count=5):
+        """
+        Generate recommendations for several users with a single model call
+        
+        Args:
+            preferences_list (list): One user preferences dict per user
+            count (int): Number of books per user
+        
+        Returns:
+            list: One list of recommended titles per user, in input order; users the
+                model skipped get fallback recommendations
+        """
+        prompt = self._create_batch_recommendation_prompt(preferences_list, count)
+        
+        try:
+            by_user = self._parse_batch_recommendations(self._generate(prompt, 'recommendations'), count)
+        except Exception as e:
+            print(f"Error generating batch recommendations: {e}")
+            by_user = {}
+        
+        return [
+            by_user.get(str(number)) or self._get_fallback_recommendations(preferences)
+            for number, preferences in enumerate(preferences_list, 1)
+        ]
+    
+    def _create_batch_recommendation_prompt(self, preferences_list, count=5):
+        """Create one prompt asking for recommendations for several numbered users"""
+        users = []
+        for number, preferences in enumerate(map(canonicalize_preferences, preferences_list), 1):
+            genres = ', '.join(preferences.get('genres', []))
+            favorite_books = ', '.join(preferences.get('favorite_books', []))
+            favorite_authors = ', '.join(preferences.get('favorite_authors', []))
+            users.append(
+                f"User {number}:\n"
+                f"        - Favorite Genres: {genres if genres else 'Not specified'}\n"
+                f"        - Favorite Books: {favorite_books if favorite_books else 'Not specified'}\n"
+                f"        - Favorite Authors: {favorite_authors if favorite_authors else 'Not specified'}"
+            )
+        user_sections = '\n\n        '.join(users)
+        
+        prompt = f"""
+        You are an expert book recommender. For each of the following users, recommend {count} books that they would love to read.
+
+        {user_sections}
+
+        Instructions:
+        1. Recommend {count} different books for every user
+        2. Each book should match that user's taste based on their preferences
+        3. Don't recommend books a user already mentioned as favorites
+        4. Respond with a single JSON object mapping each user number to a list of books, each with "title" and "author"
+        5. Only provide these fields, no descriptions or explanations
+
+        Format example:
+        {{"1": [{{"title": "The Silent Patient", "author": "Alex Michaelides"}}, {{"title": "Educated", "author": "Tara Westover"}}], "2": [{{"title": "Circe", "author": "Madeline Miller"}}]}}
+
+        Your recommendations:
+        """
+        
+        return prompt
+    
+    def _parse_batch_recommendations(self, ai_response, count=5):
+        """Parse a batch response into {user number: [titles]}"""
+        start = ai_response.find('{')
+        end = ai_response.rfind('}')
+        if start == -1 or end <= start:
+            return {}
+        
+        data = json.loads(ai_response[start:end + 1])
+        by_user = {}
+        for number, books in data.items():
+            if isinstance(books, list):
+                titles = [self._parse_book(book) if isinstance(book, dict) else self._parse_line(str(book))
+                          for book in books]
+                by_user[str(number).strip()] = [title for title in titles if title][:count]
+        return by_user
+    
+    def _create_recommendation_prompt(self, preferences, count=5):
         """Create a detailed prompt for AI recommendations"""
+        # Equivalent preference sets map to the same prompt, and so the same cache entry
+        preferences = canonicalize_preferences(preferences)
         genres = ', '.join(preferences.get('genres', []))
         favorite_books = ', '.join(preferences.get('favorite_books', []))
         favorite_authors = ', '.join(preferences.get('favorite_authors', []))
+        # Keep the prompt bounded for large libraries
+        owned_books = ', '.join(preferences.get('owned_books', [])[:30])
+        owned_line = f"\n        - Already Owned (don't recommend): {owned_books}" if owned_books else ''
         
         prompt = f"""
-        You are an expert book recommender. Based on the following user preferences, recommend 5 books that they would love to read.
+        You are an expert book recommender. Based on the following user preferences, recommend {count} books that they would love to read.
 
         User Preferences:
         - Favorite Genres: {genres if genres else 'Not specified'}
         - Favorite Books: {favorite_books if favorite_books else 'Not specified'}
-        - Favorite Authors: {favorite_authors if favorite_authors else 'Not specified'}
+        - Favorite Authors: {favorite_authors if favorite_authors else 'Not specified'}{owned_line}
 
         Instructions:
-        1. Recommend 5 different books
+        1. Recommend {count} different books
         2. Each book should match the user's taste based on their preferences
         3. Include a mix of popular and lesser-known gems
         4. Don't recommend books they already mentioned as favorites
-        5. Format your response as a simple list of book titles, one per line
-        6. Only provide the book title, no descriptions or explanations
+        5. Format your response as one JSON object per line with "title", "author" and, only if you are certain of it, "isbn"
+        6. Only provide these fields, no descriptions or explanations
 
         Format example:
-        The Silent Patient
-        Where the Crawdads Sing
-        The Seven Husbands of Evelyn Hugo
-        Educated
-        The Midnight Library
+        {{"title": "The Silent Patient", "author": "Alex Michaelides", "isbn": "9781250301697"}}
+        {{"title": "Where the Crawdads Sing", "author": "Delia Owens"}}
+        {{"title": "The Seven Husbands of Evelyn Hugo", "author": "Taylor Jenkins Reid"}}
+        {{"title": "Educated", "author": "Tara Westover"}}
+        {{"title": "The Midnight Library", "author": "Matt Haig"}}
 
         Your recommendations:
         """
         
         return prompt
     
-    def _parse_recommendations(self, ai_response):
-        """Parse AI response to extract book titles"""
-        # Split response into lines and clean up
-        lines = ai_response.strip().split('\n')
-        recommendations = []
+    def _parse_recommendations(self, ai_response, limit=5):
+        """Parse AI response to extract up to limit book titles"""
+        with span('llm.parse', limit=limit):
+            text = _CODE_FENCE.sub('', ai_response).strip()
+            
+            # A JSON document is parsed in one go; JSON Lines and free text line by line
+            books = self._load_json_books(text)
+            if books is not None:
+                titles = [self._parse_book(book) if isinstance(book, dict) else self._parse_line(str(book))
+                          for book in books]
+                return [title for title in titles if title][:limit]
+            
+            recommendations = []
+            for line in text.split('\n'):
+                title = self._parse_line(line)
+                if title:
+                    recommendations.append(title)
+                    if len(recommendations) == limit:
+                        break
+            
+            return recommendations
+    
+    def _load_json_books(self, text):
+        """
+        Return the book entries of a response holding one JSON document, or None
         
-        for line in lines:
-            # Clean up the line (remove numbers, bullets, extra spaces)
-            clean_line = line.strip()
-            if clean_line and not clean_line.startswith('Your recommendations:'):
-                # Remove common prefixes like "1.", "•", "-", etc.
-                import re
-                clean_line = re.sub(r'^\d+\.\s*', '', clean_line)
-                clean_line = re.sub(r'^[•\-\*]\s*', '', clean_line)
-                clean_line = clean_line.strip()
-                
-                if clean_line and len(clean_line) > 3:  # Basic validation
-                    recommendations.append(clean_line)
-        
-        # Return first 5 recommendations
-        return recommendations[:5]
+        The whole text is tried first, then the span from the first bracket to the
+        last, which skips prose the model put around the JSON.
+        """
+        candidates = [text]
+        start = min((i for i in (text.find('['), text.find('{')) if i != -1), default=-1)
+        end = max(text.rfind(']'), text.rfind('}'))
+        if start != -1 and end > start:
+            candidates.append(text[start:end + 1])
+        
+        for candidate in candidates:
+            try:
+                data = json.loads(candidate)
+            except ValueError:
+                continue
+            if isinstance(data, list):
+                return data
+            if isinstance(data, dict):
+                if 'title' in data:
+                    return [data]
+                # {"recommendations": [...]} and similar wrappers
+                lists = [value for value in data.values() if isinstance(value, list)]
+                if len(lists) == 1:
+                    return lists[0]
+        return None
+    
+    def _parse_line(self, line):
+        """
+        Extract a book from one line of AI response, or None if it holds none
+        
+        Lines holding a JSON object give a BookTitle with author and ISBN; other
+        lines go through the legacy free-text cleanup.
+        """
+        clean_line = line.strip()
+        if not clean_line or clean_line.startswith(('Your recommendations:', '```')):
+            return None
+        if _JSON_FRAGMENT.match(clean_line):
+            return None
+        
+        match = _JSON_OBJECT.search(clean_line)
+        if match:
+            try:
+                return self._parse_book(json.loads(match.group(0)))
+            except ValueError:
+                pass
+        
+        # Remove common prefixes like "1.", "•", "-", etc.
+        clean_line = _LIST_PREFIX.sub('', clean_line).strip()
+        
+        if len(clean_line) > 3:  # Basic validation
+            return BookTitle(clean_line)
+        
+        return None
+    
+    def _parse_book(self, book):
+        """Build a BookTitle from a {"title", "author", "isbn"} object, or None"""
+        title = str(book.get('title') or '').strip()
+        if len(title) <= 3:
+            return None
+        
+        author = str(book.get('author') or '').strip() or None
+        return BookTitle(title, author, normalize_isbn(book.get('isbn')))
     
     def _get_fallback_recommendations(self, preferences):
         """Provide fallback recommendations if AI fails"""
@@ -130,6 +584,31 @@ class BookRecommender:
         Returns:
             list: List of trending book titles
         """
+        prompt = self._create_trending_prompt(max_results)
+        
+        try:
+            return self._parse_recommendations(self._generate(prompt, 'trending'), max_results)
+        except Exception as e:
+            print(f"Error generating trending books: {e}")
+            return self._get_fallback_trending_books(max_results)
+    
+    def get_top_rated_books(self, max_results=12):
+        """
+        Get top-rated books using Gemini AI based on critical acclaim and ratings
+        
+        Returns:
+            list: List of top-rated book titles
+        """
+        prompt = self._create_top_rated_prompt(max_results)
+        
+        try:
+            return self._parse_recommendations(self._generate(prompt, 'top_rated'), max_results)
+        except Exception as e:
+            print(f"Error generating top-rated books: {e}")
+            return self._get_fallback_top_rated_books(max_results)
+    
+    def _create_trending_prompt(self, max_results):
+        """Create the prompt asking for currently trending books"""
         prompt = f"""
         You are a book industry expert with access to current reading trends and popularity data.
         
@@ -148,32 +627,21 @@ class BookRecommender:
         - Celebrity book club picks
         - Books trending on Goodreads
         
-        Format your response as a simple list of book titles, one per line.
-        Only provide the book title, no descriptions or explanations.
+        Format your response as one JSON object per line with "title" and "author".
+        Only provide these fields, no descriptions or explanations.
         
         Example format:
-        Fourth Wing
-        Tomorrow, and Tomorrow, and Tomorrow
-        Book Lovers
+        {{"title": "Fourth Wing", "author": "Rebecca Yarros"}}
+        {{"title": "Tomorrow, and Tomorrow, and Tomorrow", "author": "Gabrielle Zevin"}}
+        {{"title": "Book Lovers", "author": "Emily Henry"}}
         
         Your trending book recommendations:
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            trending_books = self._parse_recommendations(response.text)
-            return trending_books[:max_results]
-        except Exception as e:
-            print(f"Error generating trending books: {e}")
-            return self._get_fallback_trending_books(max_results)
+        return prompt
     
-    def get_top_rated_books(self, max_results=12):
-        """
-        Get top-rated books using Gemini AI based on critical acclaim and ratings
-        
-        Returns:
-            list: List of top-rated book titles
-        """
+    def _create_top_rated_prompt(self, max_results):
+        """Create the prompt asking for critically acclaimed, highly rated books"""
         prompt = f"""
         You are a literary critic and book expert with knowledge of the highest-rated books.
         
@@ -194,24 +662,18 @@ class BookRecommender:
         
         Focus on books known for exceptional quality, brilliant writing, and universal appeal.
         
-        Format your response as a simple list of book titles, one per line.
-        Only provide the book title, no descriptions or explanations.
+        Format your response as one JSON object per line with "title" and "author".
+        Only provide these fields, no descriptions or explanations.
         
         Example format:
-        The Seven Husbands of Evelyn Hugo
-        Educated
-        Where the Crawdads Sing
+        {{"title": "The Seven Husbands of Evelyn Hugo", "author": "Taylor Jenkins Reid"}}
+        {{"title": "Educated", "author": "Tara Westover"}}
+        {{"title": "Where the Crawdads Sing", "author": "Delia Owens"}}
         
         Your top-rated book recommendations:
         """
         
-        try:
-            response = self.model.generate_content(prompt)
-            top_rated_books = self._parse_recommendations(response.text)
-            return top_rated_books[:max_results]
-        except Exception as e:
-            print(f"Error generating top-rated books: {e}")
-            return self._get_fallback_top_rated_books(max_results)
+        return prompt
     
     def _get_fallback_trending_books(self, max_results):
         """Fallback trending books if AI fails"""
@@ -0,0 +1,131 @@
+import asyncio
+from utils.ai_recommender import BookRecommender
+from utils.cache import MISSING, get_async, set_async
+from utils.metrics import LLM_OUTCOMES, LLM_REQUEST_SECONDS
+from utils.single_flight import AsyncSingleFlight
+
+class AsyncBookRecommender:
+    def __init__(self, recommender=None):
+        """
+        Asyncio wrapper around BookRecommender
+
+        Shares the wrapped recommender's prompts, parser, fallbacks and response
+        cache; the cache's SQLite tier, when enabled, is read and written in a
+        worker thread. Model calls use the client's native async API when available and
+        otherwise run in the default executor. In-flight calls belong to one event
+        loop and are forgotten when the wrapper is used from another.
+
+        Args:
+            recommender (BookRecommender, optional): Sync recommender to wrap
+        """
+        self.recommender = recommender or BookRecommender()
+        self.single_flight = AsyncSingleFlight()
+        self._loop = None
+
+    def _bind_loop(self):
+        """Drop in-flight calls left over from an earlier event loop"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self.single_flight = AsyncSingleFlight()
+
+    async def _generate(self, prompt, prompt_type):
+        """Async counterpart of BookRecommender._generate"""
+        self._bind_loop()
+        recommender = self.recommender
+        key = recommender._cache_key(prompt)
+        text = await get_async(recommender.response_cache, key)
+        if text is not MISSING:
+            return text
+
+        ttl = recommender.CACHE_TTLS.get(prompt_type)
+
+        async def generate_and_store():
+            model = recommender.model
+            with LLM_REQUEST_SECONDS.time(prompt_type=prompt_type):
+                if hasattr(model, 'generate_content_async'):
+                    response = await model.generate_content_async(prompt)
+                else:
+                    loop = asyncio.get_running_loop()
+                    response = await loop.run_in_executor(None, model.generate_content, prompt)
+            await set_async(recommender.response_cache, key, response.text, ttl=ttl)
+            return response.text
+
+        async def generate_hedged():
+            # Same policy as BookRecommender._generate_hedged; late answers are still cached
+            pending = {asyncio.ensure_future(generate_and_store())}
+            if recommender.hedge_after:
+                done, pending = await asyncio.wait(pending, timeout=recommender.hedge_after)
+                if done:
+                    task = done.pop()
+                    LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='error' if task.exception() else 'ok')
+                    return task.result()
+                LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='hedged')
+                pending.add(asyncio.ensure_future(generate_and_store()))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='ok')
+                        return task.result()
+                    error = task.exception()
+            LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='error')
+            raise error
+
+        budget = recommender.latency_budgets.get(prompt_type)
+        try:
+            # shield keeps the model call running (and caching) after the caller's deadline
+            return await asyncio.wait_for(asyncio.shield(self.single_flight.do(key, generate_hedged)), budget)
+        except asyncio.TimeoutError:
+            LLM_OUTCOMES.inc(prompt_type=prompt_type, outcome='timeout')
+            raise TimeoutError("Model did not answer within the latency budget")
+
+    async def generate_recommendations(self, user_preferences, count=5):
+        """
+        Generate book recommendations based on user preferences
+
+        Args:
+            user_preferences (dict): Contains 'genres', 'favorite_books', 'favorite_authors'
+            count (int): Number of books to ask for
+
+        Returns:
+            list: List of recommended book titles
+        """
+        recommender = self.recommender
+        prompt = recommender._create_recommendation_prompt(user_preferences, count)
+
+        if await get_async(recommender.response_cache, recommender._cache_key(prompt)) is MISSING:
+            similar = recommender._similar_recommendations(user_preferences, count)
+            if similar:
+                return similar
+
+        try:
+            recommendations = recommender._parse_recommendations(await self._generate(prompt, 'recommendations'), count)
+            recommender.preference_cache.set(user_preferences, count, recommendations)
+            return recommendations
+        except Exception as e:
+            print(f"Error generating recommendations: {e}")
+            return (recommender._similar_recommendations(user_preferences, count, recommender.FALLBACK_SIMILARITY)
+                    or recommender._get_fallback_recommendations(user_preferences))
+
+    async def get_trending_books(self, max_results=12):
+        """Get trending book titles without blocking the event loop"""
+        prompt = self.recommender._create_trending_prompt(max_results)
+
+        try:
+            return self.recommender._parse_recommendations(await self._generate(prompt, 'trending'), max_results)
+        except Exception as e:
+            print(f"Error generating trending books: {e}")
+            return self.recommender._get_fallback_trending_books(max_results)
+
+    async def get_top_rated_books(self, max_results=12):
+        """Get top-rated book titles without blocking the event loop"""
+        prompt = self.recommender._create_top_rated_prompt(max_results)
+
+        try:
+            return self.recommender._parse_recommendations(await self._generate(prompt, 'top_rated'), max_results)
+        except Exception as e:
+            print(f"Error generating top-rated books: {e}")
+            return self.recommender._get_fallback_top_rated_books(max_results)
@@ -0,0 +1,242 @@
+import asyncio
+import time
+from utils.book_api import GoogleBooksAPI
+from utils.cache import MISSING, get_async
+from utils.metrics import BOOK_LOOKUPS, BOOKS_REQUEST_SECONDS, ERRORS, FALLBACK_SEARCHES
+from utils.resilience import CircuitOpenError, RetryPolicy
+from utils.single_flight import AsyncSingleFlight
+from utils.text import make_book_key, normalize_isbn
+from utils.tracing import span
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover - only needed for the async pipeline
+    aiohttp = None
+
+class AsyncGoogleBooksAPI:
+    def __init__(self, books_api=None, max_workers=20, timeout=10):
+        """
+        Asyncio Google Books API client on a pooled aiohttp session
+
+        Wraps a GoogleBooksAPI to share its query building, result extraction,
+        rate limiter, metadata cache and catalog. The HTTP session, semaphore and
+        in-flight calls belong to one event loop and are rebuilt when the client
+        is used from another, e.g. a second asyncio.run. Only the in-process cache tier is read on
+        the loop; SQLite work (the disk tier, cache writes and the catalog) runs
+        in worker threads.
+
+        Args:
+            books_api (GoogleBooksAPI, optional): Sync client to share state with
+            max_workers (int): Maximum number of in-flight API requests (connection pool size)
+            timeout (float): Total timeout in seconds for each request
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for AsyncGoogleBooksAPI (pip install aiohttp)")
+
+        self.books_api = books_api or GoogleBooksAPI()
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.single_flight = AsyncSingleFlight()
+        self._http = None
+        self._semaphore = None
+        self._loop = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled HTTP session if it belongs to the running event loop"""
+        if self._http is not None and self._loop is asyncio.get_running_loop():
+            await self._http.close()
+        self._http = None
+
+    def _bind_loop(self):
+        """Drop the state bound to an earlier event loop when called from a new one"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The old session can't be closed from here; its loop is usually closed already
+            self._loop = loop
+            self._http = None
+            self._semaphore = None
+            self.single_flight = AsyncSingleFlight()
+
+    def _get_http(self):
+        """Create the pooled session lazily inside the running event loop"""
+        self._bind_loop()
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_workers, ttl_dns_cache=300)
+            self._http = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._http
+
+    async def _request_async(self, params):
+        """
+        Send a rate-limited, concurrency-capped search request without blocking the loop
+
+        Shares the sync client's retry policy and circuit breaker.
+        """
+        circuit_breaker = self.books_api.circuit_breaker
+        retry_policy = self.books_api.retry_policy
+        if not circuit_breaker.allow():
+            raise CircuitOpenError("Google Books circuit is open")
+
+        rate_limiter = self.books_api.rate_limiter
+        http = self._get_http()
+        query = {k: str(v) for k, v in params.items()}
+        attempt = 0
+        while True:
+            while not rate_limiter.try_acquire():
+                await asyncio.sleep(1 / rate_limiter.rate)
+
+            try:
+                async with self._semaphore:
+                    start = time.perf_counter()
+                    with span('books.request', attempt=attempt) as attributes:
+                        async with http.get(self.books_api.base_url, params=query) as response:
+                            attributes['status'] = response.status
+                            BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status=response.status)
+                            if response.status not in RetryPolicy.RETRY_STATUSES:
+                                circuit_breaker.record_success()
+                                response.raise_for_status()
+                                return await response.json()
+
+                            delay = retry_policy.delay(attempt, response.headers.get('Retry-After'))
+                            if delay is None:
+                                circuit_breaker.record_failure()
+                                response.raise_for_status()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status='error')
+                delay = retry_policy.delay(attempt)
+                if delay is None:
+                    circuit_breaker.record_failure()
+                    raise
+            except aiohttp.ClientResponseError:
+                # Raised by raise_for_status above, after the outcome was recorded
+                raise
+            except aiohttp.ClientError:
+                # Payload errors and the like aren't retried but still count as failures,
+                # which also settles a half-open probe
+                BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status='error')
+                circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                # Local faults and cancellation say nothing about Google Books; just free a half-open probe
+                circuit_breaker.release()
+                raise
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _cached_async(self, key, loader):
+        """Async counterpart of _cached: read-through cache with coalesced misses"""
+        self._bind_loop()
+        value = await get_async(self.books_api.cache, key)
+        if value is not MISSING:
+            return value
+
+        async def load_and_store():
+            value = await loader()
+            await asyncio.to_thread(self.books_api._store, key, value)
+            return value
+
+        return await self.single_flight.do(key, load_and_store)
+
+    async def search_book(self, title, author=None, isbn=None):
+        """
+        Search for a single book by title and optionally author
+
+        Args:
+            title (str): Book title
+            author (str, optional): Author name
+            isbn (str, optional): ISBN to try before the title search
+
+        Returns:
+            dict: Book information or None if not found
+        """
+        catalog = self.books_api.catalog
+        if catalog is not None:
+            book_info = await asyncio.to_thread(catalog.lookup, title, author)
+            if book_info:
+                return book_info
+
+        try:
+            return await self._cached_async('book:' + make_book_key(title, author),
+                                            lambda: self._search_book_uncached_async(title, author, isbn))
+
+        except Exception as e:
+            print(f"Error searching for '{title}': {e}")
+            ERRORS.inc(component='books')
+            return None
+
+    async def _search_book_uncached_async(self, title, author=None, isbn=None):
+        """Query the API for a title, falling back to a broader search; raises on request errors"""
+        isbn = normalize_isbn(isbn)
+        if isbn:
+            book_info = await self._cached_async('isbn:' + isbn, lambda: self._isbn_lookup_async(isbn))
+            # Model-supplied ISBNs are sometimes wrong, so check we got the book we asked for
+            if book_info and self.books_api._title_agrees(book_info, title):
+                return await asyncio.to_thread(self.books_api._remember, book_info, title, author)
+
+        data = await self._request_async(self.books_api._search_params(title, author))
+        if data.get('items'):
+            book_info = self.books_api._extract_book_info(data['items'][0])
+            return await asyncio.to_thread(self.books_api._remember, book_info, title, author)
+
+        # Try a broader search if exact search fails; as in the sync client, a loose
+        # match is not aliased to the asked-for title
+        book_info = await self._cached_async('fallback:' + make_book_key(title, author),
+                                             lambda: self._fallback_lookup_async(title, author))
+        return await asyncio.to_thread(self.books_api._remember, book_info)
+
+    async def _isbn_lookup_async(self, isbn):
+        """Query the API for one ISBN and remember the result; raises on request errors"""
+        data = await self._request_async(self.books_api._isbn_params(isbn))
+        if not data.get('items'):
+            return None
+        return await asyncio.to_thread(self.books_api._remember, self.books_api._extract_book_info(data['items'][0]))
+
+    async def _fallback_lookup_async(self, title, author=None):
+        """Resolve a near-miss title locally, else run the broader fallback query; raises on request errors"""
+        FALLBACK_SEARCHES.inc()
+        book_info = await asyncio.to_thread(self.books_api._fuzzy_match, title, author)
+        if book_info:
+            return book_info
+
+        params, words = self.books_api._fallback_params(title)
+        if params is None:
+            return None
+
+        return self.books_api._pick_fallback_match(await self._request_async(params), words)
+
+    async def get_multiple_books(self, book_titles):
+        """
+        Get information for multiple books concurrently
+
+        Args:
+            book_titles (list): List of book titles
+
+        Returns:
+            list: List of book information dictionaries, in the same order as book_titles
+        """
+        return list(await asyncio.gather(*(self._lookup_or_placeholder_async(title)
+                                           for title in book_titles)))
+
+    async def _lookup_or_placeholder_async(self, title):
+        """Search for a title, returning a placeholder for books not found"""
+        with span('books.lookup', title=str(title)) as attributes:
+            book_info = await self.search_book(title, getattr(title, 'author', None), getattr(title, 'isbn', None))
+            attributes['found'] = bool(book_info)
+
+        if book_info:
+            BOOK_LOOKUPS.inc(result='found')
+            # Copy so callers can annotate results without touching the cached entry
+            return dict(book_info)
+
+        BOOK_LOOKUPS.inc(result='placeholder')
+        return self.books_api._create_placeholder_book(title)
@@ -1,74 +1,463 @@
+import json
+import os
 import requests
+import threading
 import time
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from utils.cache import MISSING, create_tiered_cache
+from utils.catalog import BookCatalog
+from utils.metrics import BOOK_LOOKUPS, BOOKS_REQUEST_SECONDS, ERRORS, FALLBACK_SEARCHES
+from utils.rate_limiter import TokenBucket
+from utils.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+from utils.single_flight import SingleFlight
+from utils.fuzzy_index import trigrams
+from utils.text import make_book_key, normalize_isbn, normalize_text
+from utils.tracing import propagate, span
 
 class GoogleBooksAPI:
-    def __init__(self):
-        """Initialize Google Books API client"""
-        self.base_url = "https://www.googleapis.com/books/v1/volumes"
+    # How long found books and confirmed misses stay cached
+    CACHE_TTL = 7 * 24 * 3600
+    NEGATIVE_CACHE_TTL = 6 * 3600
+    # ISBNs combined into one OR query; each result is matched back by its identifiers
+    ISBN_BATCH_SIZE = 10
+    
+    def __init__(self, max_workers=6, requests_per_second=10, burst=None, cache=None,
+                 single_flight=None, catalog=None, fuzzy_threshold=0.8, timeout=(3.05, 10),
+                 retry_policy=None, circuit_breaker=None):
+        """
+        Initialize Google Books API client
+        
+        Args:
+            max_workers (int): Maximum number of in-flight API requests
+            requests_per_second (float): Sustained request rate allowed by the token bucket
+            burst (int, optional): Token bucket capacity (defaults to requests_per_second)
+            cache (optional): Metadata cache; defaults to an in-process LRU over an SQLite store
+            single_flight (SingleFlight, optional): Coalesces identical in-flight lookups
+            catalog (BookCatalog, optional): Local catalog consulted before the API and
+                back-filled from successful lookups; defaults to the on-disk catalog
+            fuzzy_threshold (float): Minimum trigram similarity for accepting a local fuzzy
+                title match instead of running the network fallback search
+            timeout (tuple): (connect, read) timeouts in seconds for each request
+            retry_policy (RetryPolicy, optional): Backoff for 429 and 5xx responses and
+                connection errors; defaults to two jittered retries
+            circuit_breaker (CircuitBreaker, optional): Fails requests fast while Google
+                Books is unhealthy, so lookups fall back to cache or placeholders
+        """
+        # BOOKAI_BOOKS_BASE_URL points the client at a mirror or the local benchmark server
+        self.base_url = os.getenv('BOOKAI_BOOKS_BASE_URL', "https://www.googleapis.com/books/v1/volumes")
         self.session = requests.Session()
+        self.max_workers = max(1, max_workers)
+        # Keep one pooled connection per worker so parallel lookups reuse sockets
+        for prefix in ('https://', 'http://'):
+            self.session.mount(prefix, requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers))
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self._in_flight = threading.BoundedSemaphore(self.max_workers)
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker('google-books')
+        
+        if cache is None:
+            cache = create_tiered_cache(
+                'books.sqlite3',
+                memory_size=2048,
+                memory_ttl=self.CACHE_TTL,
+                disk_ttl=self.CACHE_TTL,
+                disk_entries=50000
+            )
+        self.cache = cache
+        self.single_flight = single_flight or SingleFlight()
+        
+        if catalog is None:
+            try:
+                catalog = BookCatalog()
+            except Exception as e:
+                print(f"Local catalog unavailable: {e}")
+        self.catalog = catalog
+        self.fuzzy_threshold = fuzzy_threshold
+    
+    def _request(self, params=None, url=None):
+        """
+        Send a rate-limited, concurrency-capped request to the volumes endpoint or a volume URL
+        
+        Transient failures are retried per retry_policy; raises CircuitOpenError without
+        sending anything while the circuit breaker is open.
+        """
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError("Google Books circuit is open")
+        
+        attempt = 0
+        while True:
+            with span('books.rate_limit'):
+                self.rate_limiter.acquire()
+            try:
+                with self._in_flight, span('books.request', attempt=attempt) as attributes:
+                    start = time.perf_counter()
+                    response = self.session.get(url or self.base_url, params=params, timeout=self.timeout)
+                    attributes['status'] = response.status_code
+            except (requests.ConnectionError, requests.Timeout):
+                BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status='error')
+                delay = self.retry_policy.delay(attempt)
+                if delay is None:
+                    self.circuit_breaker.record_failure()
+                    raise
+            except requests.RequestException:
+                # Broken bodies, redirect loops and the like aren't retried but still count
+                # as failures, which also settles a half-open probe
+                BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status='error')
+                self.circuit_breaker.record_failure()
+                raise
+            except BaseException:
+                # Local faults say nothing about Google Books; just free a half-open probe
+                self.circuit_breaker.release()
+                raise
+            else:
+                BOOKS_REQUEST_SECONDS.observe(time.perf_counter() - start, status=response.status_code)
+                if response.status_code not in RetryPolicy.RETRY_STATUSES:
+                    # Any answer from Google, including a 404, shows the upstream is healthy
+                    self.circuit_breaker.record_success()
+                    response.raise_for_status()
+                    return response.json()
+                
+                delay = self.retry_policy.delay(attempt, response.headers.get('Retry-After'))
+                if delay is None:
+                    self.circuit_breaker.record_failure()
+                    response.raise_for_status()
+            
+            # Sleep outside the semaphore so waiting retries don't hold connection slots
+            with span('books.retry_wait', attempt=attempt):
+                time.sleep(delay)
+            attempt += 1
+    
+    def _cached(self, key, loader):
+        """
+        Return the cached value for key, calling loader on a miss
+        
+        Empty results are cached for NEGATIVE_CACHE_TTL so misses aren't retried on every
+        request. Concurrent misses on the same key share a single loader call. Exceptions
+        raised by loader propagate and are never cached.
+        """
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+        
+        def load_and_store():
+            value = loader()
+            self._store(key, value)
+            return value
+        
+        return self.single_flight.do(key, load_and_store)
+    
+    def _store(self, key, value):
+        """Cache a lookup result, using the shorter negative TTL for empty results"""
+        self.cache.set(key, value, ttl=self.CACHE_TTL if value else self.NEGATIVE_CACHE_TTL)
     
-    def search_book(self, title, author=None):
+    def _cached_request(self, params):
+        """Search the volumes endpoint, caching the returned items by query parameters"""
+        key = 'query:' + json.dumps(params, sort_keys=True)
+        items = self._cached(key, lambda: self._request(params).get('items', []))
+        return {'items': items}
+    
+    def search_book(self, title, author=None, isbn=None):
         """
         Search for a single book by title and optionally author
         
         Args:
             title (str): Book title
             author (str, optional): Author name
+            isbn (str, optional): ISBN to try before the title search
         
         Returns:
             dict: Book information or None if not found
         """
+        if self.catalog is not None:
+            with span('books.catalog') as attributes:
+                book_info = self.catalog.lookup(title, author)
+                attributes['hit'] = bool(book_info)
+            if book_info:
+                return book_info
+        
+        try:
+            return self._cached('book:' + make_book_key(title, author),
+                                lambda: self._search_book_uncached(title, author, isbn))
+        
+        except Exception as e:
+            print(f"Error searching for '{title}': {e}")
+            ERRORS.inc(component='books')
+            return None
+    
+    def _remember(self, book_info, title=None, author=None):
+        """
+        Back-fill the local catalog and the identifier cache keys with a book found by the API
+        
+        title and author become permanent catalog aliases for the book, so pass them
+        only when the book is known to be the one asked for.
+        """
+        if not book_info:
+            return book_info
+        
+        # Later lookups by volume ID or ISBN are then served without a request
+        if book_info.get('google_books_id'):
+            self._store('volume:' + book_info['google_books_id'], book_info)
+        for isbn in book_info.get('isbns') or []:
+            self._store('isbn:' + isbn, book_info)
+        
+        if self.catalog is not None:
+            try:
+                self.catalog.add(book_info, title, author)
+            except Exception as e:
+                print(f"Could not add '{book_info['title']}' to the catalog: {e}")
+        return book_info
+    
+    def _search_params(self, title, author=None):
+        """Build the exact-match query parameters for a title and optional author"""
         # Create search query
         query = f'intitle:"{title}"'
         if author:
             query += f' inauthor:"{author}"'
         
-        params = {
+        return {
             'q': query,
             'maxResults': 1,
             'printType': 'books'
         }
+    
+    def _isbn_params(self, isbn):
+        """Build the query parameters for an ISBN lookup"""
+        return {
+            'q': f'isbn:{isbn}',
+            'maxResults': 1,
+            'printType': 'books'
+        }
+    
+    def _title_agrees(self, book_info, title):
+        """Check that a book found by identifier is the one asked for by title"""
+        found = normalize_text(book_info['title'])
+        wanted = normalize_text(title)
+        if wanted in found or found in wanted:
+            return True
+        grams = trigrams(title)
+        found_grams = trigrams(book_info['title'])
+        return 2.0 * len(grams & found_grams) / (len(grams) + len(found_grams)) >= 0.6
+    
+    def _search_book_uncached(self, title, author=None, isbn=None):
+        """Query the API for a title, falling back to a broader search; raises on request errors"""
+        isbn = normalize_isbn(isbn)
+        if isbn:
+            book_info = self._cached('isbn:' + isbn, lambda: self._remember(self._isbn_lookup(isbn)))
+            # Model-supplied ISBNs are sometimes wrong, so check we got the book we asked for
+            if book_info and self._title_agrees(book_info, title):
+                return self._remember(book_info, title, author)
+        
+        data = self._request(self._search_params(title, author))
+        if data.get('items'):
+            return self._remember(self._extract_book_info(data['items'][0]), title, author)
+        
+        # Try a broader search if exact search fails; a loose match is cataloged under
+        # its own title only, so a wrong guess expires with the cache instead of sticking
+        return self._remember(self._cached('fallback:' + make_book_key(title, author),
+                                           lambda: self._fallback_lookup(title, author)))
+    
+    def get_multiple_books(self, book_titles, max_workers=None):
+        """
+        Get information for multiple books concurrently
         
-        try:
-            response = self.session.get(self.base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            if data.get('items'):
-                return self._extract_book_info(data['items'][0])
-            else:
-                # Try a broader search if exact search fails
-                return self._fallback_search(title)
+        Args:
+            book_titles (iterable): Book titles; a generator is consumed lazily, so each
+                lookup starts as soon as its title is produced
+            max_workers (int, optional): Override the number of parallel lookups
         
-        except Exception as e:
-            print(f"Error searching for '{title}': {e}")
-            return None
+        Returns:
+            list: List of book information dictionaries, in the same order as book_titles
+        """
+        workers = max_workers or self.max_workers
+        if hasattr(book_titles, '__len__'):
+            if not book_titles:
+                return []
+            workers = min(workers, len(book_titles))
+        
+        if workers <= 1:
+            return [self._lookup_or_placeholder(title) for title in book_titles]
+        
+        # Pacing is handled by the shared token bucket in _request; map submits each
+        # lookup as it pulls the title from the iterable
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(propagate(self._lookup_or_placeholder), book_titles))
     
-    def get_multiple_books(self, book_titles):
+    def iter_multiple_books(self, book_titles, max_workers=None):
         """
-        Get information for multiple books
+        Look up multiple books concurrently, yielding each as soon as it resolves
         
         Args:
             book_titles (list): List of book titles
+            max_workers (int, optional): Override the number of parallel lookups
+        
+        Yields:
+            tuple: (index into book_titles, book information dictionary) in completion order
+        """
+        if not book_titles:
+            return
+        
+        workers = min(max_workers or self.max_workers, len(book_titles))
+        executor = ThreadPoolExecutor(max_workers=workers)
+        lookup = propagate(self._lookup_or_placeholder)
+        try:
+            futures = {executor.submit(lookup, title): index
+                       for index, title in enumerate(book_titles)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Don't block on lookups nobody will read if the consumer stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def get_book_by_id(self, volume_id):
+        """
+        Get a book by its Google Books volume ID
+        
+        Args:
+            volume_id (str): Volume ID, as stored in google_books_id
         
         Returns:
-            list: List of book information dictionaries
+            dict: Book information or None if not found
         """
-        books = []
+        try:
+            return self.fetch_book_by_id(volume_id)
         
-        for title in book_titles:
-            book_info = self.search_book(title)
-            
+        except Exception as e:
+            print(f"Error fetching volume '{volume_id}': {e}")
+            ERRORS.inc(component='books')
+            return None
+    
+    def fetch_book_by_id(self, volume_id):
+        """
+        Get a book by its Google Books volume ID, letting request errors propagate
+        
+        Use this instead of get_book_by_id when "not found" and "lookup failed"
+        must be told apart, e.g. before caching a negative result.
+        
+        Returns:
+            dict: Book information or None if the volume doesn't exist
+        """
+        if self.catalog is not None:
+            book_info = self.catalog.get(volume_id)
             if book_info:
-                books.append(book_info)
+                return book_info
+        
+        return self._cached('volume:' + volume_id, lambda: self._remember(self._volume_lookup(volume_id)))
+    
+    def _volume_lookup(self, volume_id):
+        """Fetch one volume directly; returns None for unknown IDs and raises on other request errors"""
+        try:
+            item = self._request(url=f"{self.base_url}/{quote(volume_id, safe='')}")
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+        return self._extract_book_info(item)
+    
+    def get_books_by_ids(self, volume_ids, max_workers=None):
+        """
+        Get many books by volume ID concurrently
+        
+        Returns:
+            list: Book information dictionaries or None, in the same order as volume_ids
+        """
+        volume_ids = list(volume_ids)
+        workers = min(max_workers or self.max_workers, len(volume_ids))
+        if workers <= 1:
+            return [self.get_book_by_id(volume_id) for volume_id in volume_ids]
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self.get_book_by_id, volume_ids))
+    
+    def get_book_by_isbn(self, isbn):
+        """
+        Get a book by ISBN-10 or ISBN-13
+        
+        Returns:
+            dict: Book information or None if not found or not a valid ISBN
+        """
+        isbn = normalize_isbn(isbn)
+        if not isbn:
+            return None
+        
+        try:
+            return self._cached('isbn:' + isbn, lambda: self._remember(self._isbn_lookup(isbn)))
+        
+        except Exception as e:
+            print(f"Error searching for ISBN '{isbn}': {e}")
+            ERRORS.inc(component='books')
+            return None
+    
+    def _isbn_lookup(self, isbn):
+        """Query the API for one ISBN; raises on request errors"""
+        data = self._request(self._isbn_params(isbn))
+        if data.get('items'):
+            return self._extract_book_info(data['items'][0])
+        return None
+    
+    def get_books_by_isbn(self, isbns):
+        """
+        Get many books by ISBN using as few requests as possible
+        
+        Cached ISBNs are answered directly; the rest are combined into OR queries of
+        ISBN_BATCH_SIZE, and any the combined query didn't return get an exact lookup each.
+        
+        Args:
+            isbns (iterable): ISBN-10 or ISBN-13 strings, with or without hyphens
+        
+        Returns:
+            dict: Normalized ISBN -> book information, or None if not found
+        """
+        found = {}
+        pending = []
+        for isbn in dict.fromkeys(filter(None, map(normalize_isbn, isbns))):
+            book_info = self.cache.get('isbn:' + isbn)
+            if book_info is MISSING:
+                pending.append(isbn)
             else:
-                # Add a placeholder for books not found
-                books.append(self._create_placeholder_book(title))
+                found[isbn] = book_info
+        
+        for start in range(0, len(pending), self.ISBN_BATCH_SIZE):
+            chunk = pending[start:start + self.ISBN_BATCH_SIZE]
+            if len(chunk) > 1:
+                try:
+                    data = self._request({
+                        'q': ' OR '.join(f'isbn:{isbn}' for isbn in chunk),
+                        'maxResults': 40,
+                        'printType': 'books'
+                    })
+                except Exception as e:
+                    print(f"Combined ISBN search failed: {e}")
+                    data = {}
+                
+                for item in data.get('items', []):
+                    book_info = self._extract_book_info(item)
+                    for isbn in book_info['isbns']:
+                        if isbn in chunk and isbn not in found:
+                            found[isbn] = self._remember(book_info)
             
-            # Small delay to be respectful to the API
-            time.sleep(0.5)
+            for isbn in chunk:
+                if isbn not in found:
+                    found[isbn] = self.get_book_by_isbn(isbn)
         
-        return books
+        return found
+    
+    def _lookup_or_placeholder(self, title):
+        """Search for a title, returning a placeholder for books not found"""
+        with span('books.lookup', title=str(title)) as attributes:
+            # Recommended titles may carry the author and ISBN the model gave
+            book_info = self.search_book(title, getattr(title, 'author', None), getattr(title, 'isbn', None))
+            attributes['found'] = bool(book_info)
+        
+        if book_info:
+            BOOK_LOOKUPS.inc(result='found')
+            # Copy so callers can annotate results without touching the cached entry
+            return dict(book_info)
+        
+        # Add a placeholder for books not found
+        BOOK_LOOKUPS.inc(result='placeholder')
+        return self._create_placeholder_book(title)
     
     def _extract_book_info(self, book_item):
         """Extract relevant information from Google Books API response"""
@@ -101,6 +490,10 @@ class GoogleBooksAPI:
         # Extract publisher
         publisher = volume_info.get('publisher', 'Unknown Publisher')
         
+        # Extract ISBNs, used as alternate lookup keys
+        isbns = [identifier['identifier'] for identifier in volume_info.get('industryIdentifiers', [])
+                 if identifier.get('type') in ('ISBN_13', 'ISBN_10')]
+        
         # Create clean description (limit length)
         if description and len(description) > 500:
             description = description[:497] + "..."
@@ -118,40 +511,67 @@ class GoogleBooksAPI:
             'page_count': page_count,
             'publisher': publisher,
             'google_books_id': book_item.get('id'),
+            'isbns': isbns,
             'preview_link': volume_info.get('previewLink', ''),
             'info_link': volume_info.get('infoLink', '')
         }
     
-    def _fallback_search(self, title):
+    def _fallback_search(self, title, author=None):
         """Try a broader search if exact search fails"""
+        try:
+            return self._cached('fallback:' + make_book_key(title, author), lambda: self._fallback_lookup(title, author))
+        
+        except Exception as e:
+            print(f"Fallback search failed: {e}")
+            return None
+    
+    def _fuzzy_match(self, title, author=None):
+        """Resolve a near-miss title, checked against the author if known, from the local catalog's fuzzy index, or None"""
+        if self.catalog is None:
+            return None
+        return self.catalog.fuzzy_lookup(title, author, threshold=self.fuzzy_threshold)
+    
+    def _fallback_lookup(self, title, author=None):
+        """Resolve a near-miss title locally, else run the broader fallback query; raises on request errors"""
+        FALLBACK_SEARCHES.inc()
+        with span('books.fallback_search') as attributes:
+            book_info = self._fuzzy_match(title, author)
+            if book_info:
+                attributes['source'] = 'fuzzy_index'
+                return book_info
+            
+            params, words = self._fallback_params(title)
+            if params is None:
+                return None
+            
+            attributes['source'] = 'api'
+            return self._pick_fallback_match(self._request(params), words)
+    
+    def _fallback_params(self, title):
+        """Build the broader fallback query, or None if the title is too short for one"""
         # Remove common words and try again
         clean_title = title.replace('The ', '').replace('A ', '').replace('An ', '')
         words = clean_title.split()
         
-        if len(words) > 1:
-            # Try searching with just the first few words
-            fallback_query = ' '.join(words[:3])
-            
-            params = {
-                'q': fallback_query,
-                'maxResults': 5,
-                'printType': 'books'
-            }
-            
-            try:
-                response = self.session.get(self.base_url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                if data.get('items'):
-                    # Return the first result that seems relevant
-                    for item in data['items']:
-                        item_title = item.get('volumeInfo', {}).get('title', '').lower()
-                        if any(word.lower() in item_title for word in words[:2]):
-                            return self._extract_book_info(item)
-            
-            except Exception as e:
-                print(f"Fallback search failed: {e}")
+        if len(words) <= 1:
+            return None, words
+        
+        # Try searching with just the first few words
+        fallback_query = ' '.join(words[:3])
+        
+        params = {
+            'q': fallback_query,
+            'maxResults': 5,
+            'printType': 'books'
+        }
+        return params, words
+    
+    def _pick_fallback_match(self, data, words):
+        """Return the first fallback result that seems relevant"""
+        for item in data.get('items') or []:
+            item_title = item.get('volumeInfo', {}).get('title', '').lower()
+            if any(word.lower() in item_title for word in words[:2]):
+                return self._extract_book_info(item)
         
         return None
     
@@ -199,10 +619,7 @@ class GoogleBooksAPI:
             }
             
             try:
-                response = self.session.get(self.base_url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
+                data = self._cached_request(params)
                 if data.get('items'):
                     for item in data['items']:
                         book_info = self._extract_book_info(item)
@@ -214,8 +631,6 @@ class GoogleBooksAPI:
                             book_info['trending_score'] = trending_score
                             trending_books.append(book_info)
                 
-                time.sleep(0.3)  # Rate limiting
-                
             except Exception as e:
                 print(f"Error fetching trending books for '{query}': {e}")
                 continue
@@ -262,10 +677,7 @@ class GoogleBooksAPI:
             }
             
             try:
-                response = self.session.get(self.base_url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
+                data = self._cached_request(params)
                 if data.get('items'):
                     for item in data['items']:
                         book_info = self._extract_book_info(item)
@@ -274,8 +686,6 @@ class GoogleBooksAPI:
                         if len(top_rated_books) < max_results * 2:  # Get more books to filter from
                             top_rated_books.append(book_info)
                 
-                time.sleep(0.3)  # Rate limiting
-                
             except Exception as e:
                 print(f"Error fetching top-rated books for '{category}': {e}")
                 continue
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinel returned by caches on a miss, so that None can be cached as a negative result
+MISSING = object()
+
+class LRUCache:
+    def __init__(self, maxsize=1024, ttl=3600):
+        """
+        In-process LRU cache with per-entry expiry
+
+        Args:
+            maxsize (int): Maximum number of entries before the least recently used is evicted
+            ttl (float): Default time-to-live in seconds
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_entry(self, key):
+        """Return (value, expires_at) for a live entry, or (MISSING, None)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING, None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return MISSING, None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value, expires_at
+
+    def get(self, key, default=MISSING):
+        """Return the cached value for key, or default if missing or expired"""
+        value, _ = self.get_entry(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """Store a value, evicting the least recently used entry when full"""
+        if expires_at is None:
+            expires_at = time.time() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove a key if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class SQLiteCache:
+    def __init__(self, path, ttl=86400, max_entries=10000):
+        """
+        On-disk cache backed by SQLite that survives restarts
+
+        Args:
+            path (str): Database file path (parent directories are created)
+            ttl (float): Default time-to-live in seconds
+            max_entries (int): Size limit; least recently used rows are pruned past it
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+            'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache (accessed_at)')
+        self._conn.commit()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_entry(self, key):
+        """Return (value, expires_at) for a live entry, or (MISSING, None)"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return MISSING, None
+
+            self._conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0]), row[1]
+
+    def get(self, key, default=MISSING):
+        """Return the cached value for key, or default if missing or expired"""
+        value, _ = self.get_entry(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """Store a JSON-serializable value"""
+        now = time.time()
+        if expires_at is None:
+            expires_at = now + (self.ttl if ttl is None else ttl)
+
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, payload, expires_at, now)
+            )
+            self._writes += 1
+            # Checking the size on every write would cost a table scan, so prune periodically
+            if self._writes % 100 == 0:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now):
+        """Drop expired rows, then the least recently used rows beyond max_entries"""
+        cursor = self._conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        self.evictions += cursor.rowcount
+
+        count = self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            cursor = self._conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)', (excess,)
+            )
+            self.evictions += cursor.rowcount
+
+    def delete(self, key):
+        """Remove a key if present"""
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            self._conn.execute('DELETE FROM cache')
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def stats(self):
+        """Return hit/miss counters and current size"""
+        return {
+            'size': len(self),
+            'maxsize': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+class TieredCache:
+    def __init__(self, *tiers):
+        """
+        Chain several caches, fastest first
+
+        Reads check each tier in order and promote hits into the faster tiers.
+        Writes go to every tier.
+        """
+        self.tiers = [tier for tier in tiers if tier is not None]
+
+    def get(self, key, default=MISSING):
+        """Return the cached value for key from the first tier that has it"""
+        for index, tier in enumerate(self.tiers):
+            value, expires_at = tier.get_entry(key)
+            if value is not MISSING:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value, expires_at=expires_at)
+                return value
+        return default
+
+    def set(self, key, value, ttl=None):
+        """Store a value in every tier"""
+        expires_at = time.time() + ttl if ttl is not None else None
+        for tier in self.tiers:
+            tier.set(key, value, ttl=ttl, expires_at=expires_at)
+
+    def delete(self, key):
+        """Remove a key from every tier"""
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self):
+        """Remove all entries from every tier"""
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        """Return per-tier statistics"""
+        return {type(tier).__name__: tier.stats() for tier in self.tiers}
+
+def get_cache_dir():
+    """Directory for on-disk caches, configurable with BOOKAI_CACHE_DIR"""
+    return os.getenv('BOOKAI_CACHE_DIR', os.path.join(os.getcwd(), '.cache'))
+
+def create_tiered_cache(filename, memory_size=1024, memory_ttl=3600, disk_ttl=86400, disk_entries=10000):
+    """
+    Build an in-process LRU in front of an SQLite store in the cache directory
+
+    Falls back to the memory tier alone if the disk store can't be opened.
+    """
+    memory = LRUCache(maxsize=memory_size, ttl=memory_ttl)
+
+    try:
+        disk = SQLiteCache(os.path.join(get_cache_dir(), filename), ttl=disk_ttl, max_entries=disk_entries)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Disk cache unavailable, using memory only: {e}")
+        disk = None
+
+    return TieredCache(memory, disk)
+
+def split_tiers(cache):
+    """Split a cache into its in-process tier (or None) and the tiers whose reads do I/O"""
+    tiers = cache.tiers if isinstance(cache, TieredCache) else [cache]
+    if tiers and isinstance(tiers[0], LRUCache):
+        return tiers[0], tiers[1:]
+    return None, tiers
+
+async def get_async(cache, key, default=MISSING):
+    """
+    Read a cache from a coroutine without blocking the event loop
+
+    The in-process tier is read directly; slower tiers are read in a worker
+    thread, and their hits promoted into the in-process tier.
+    """
+    memory, blocking = split_tiers(cache)
+    if memory is not None:
+        value = memory.get(key)
+        if value is not MISSING:
+            return value
+    if not blocking:
+        return default
+
+    def read_blocking():
+        for tier in blocking:
+            value, expires_at = tier.get_entry(key)
+            if value is not MISSING:
+                if memory is not None:
+                    memory.set(key, value, expires_at=expires_at)
+                return value
+        return default
+
+    return await asyncio.to_thread(read_blocking)
+
+async def set_async(cache, key, value, ttl=None):
+    """Write a cache from a coroutine, in a worker thread if any tier does I/O"""
+    if split_tiers(cache)[1]:
+        await asyncio.to_thread(cache.set, key, value, ttl=ttl)
+    else:
+        cache.set(key, value, ttl=ttl)
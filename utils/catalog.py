@@ -0,0 +1,288 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from utils.cache import get_cache_dir
+from utils.fuzzy_index import TrigramIndex
+from utils.text import normalize_text
+
+# Fields every record carries, matching GoogleBooksAPI._extract_book_info
+BOOK_DEFAULTS = {
+    'title': 'Unknown Title',
+    'authors': ['Unknown Author'],
+    'author_string': 'Unknown Author',
+    'published_date': 'Unknown',
+    'description': 'Description not available.',
+    'average_rating': None,
+    'ratings_count': None,
+    'categories': [],
+    'thumbnail': '',
+    'page_count': None,
+    'publisher': 'Unknown Publisher',
+    'google_books_id': None,
+    'isbns': [],
+    'preview_link': '',
+    'info_link': ''
+}
+
+def normalize_record(row):
+    """
+    Coerce an imported row into the book dictionary shape used across the app
+
+    List fields may be given as lists or as strings separated by ';'.
+    """
+    book = dict(BOOK_DEFAULTS)
+    book.update({k: v for k, v in row.items() if k in BOOK_DEFAULTS and v not in (None, '')})
+
+    for field in ('authors', 'categories', 'isbns'):
+        if isinstance(book[field], str):
+            book[field] = [part.strip() for part in book[field].split(';') if part.strip()]
+    if not book['authors']:
+        book['authors'] = list(BOOK_DEFAULTS['authors'])
+    if 'author_string' not in row or not row['author_string']:
+        book['author_string'] = ', '.join(book['authors'])
+
+    for field, cast in (('average_rating', float), ('ratings_count', int), ('page_count', int)):
+        if book[field] is not None:
+            try:
+                book[field] = cast(book[field])
+            except (TypeError, ValueError):
+                book[field] = None
+
+    return book
+
+class BookCatalog:
+    def __init__(self, path=None):
+        """
+        Local store of book records indexed by normalized title and author
+
+        Args:
+            path (str, optional): SQLite file path; defaults to catalog.sqlite3 in the cache directory
+        """
+        path = path or os.path.join(get_cache_dir(), 'catalog.sqlite3')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS books (
+                book_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                ratings_count INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                title_key TEXT NOT NULL,
+                author_key TEXT NOT NULL,
+                book_id TEXT NOT NULL,
+                PRIMARY KEY (title_key, author_key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_aliases_book ON aliases (book_id);
+        ''')
+        self._conn.commit()
+        # Built on first fuzzy search, then kept current by _add
+        self._title_index = None
+        self._title_books = {}
+
+    def _book_id(self, book):
+        """Use the Google Books volume ID, or a normalized title/author key for local records"""
+        if book.get('google_books_id'):
+            return book['google_books_id']
+        return f"local:{normalize_text(book['title'])}|{normalize_text(book['authors'][0])}"
+
+    def _add(self, book, query_title=None, query_author=None):
+        """Insert a record and its aliases; the caller holds the lock and commits"""
+        book_id = self._book_id(book)
+        self._conn.execute(
+            'INSERT OR REPLACE INTO books (book_id, data, ratings_count, updated_at) VALUES (?, ?, ?, ?)',
+            (book_id, json.dumps(book), book.get('ratings_count') or 0, time.time())
+        )
+
+        title_key = normalize_text(book['title'])
+        aliases = {(title_key, '')}
+        aliases.update((title_key, normalize_text(author)) for author in book['authors'])
+        # Also remember the title as it was asked for, which often differs from the canonical one
+        if query_title:
+            aliases.add((normalize_text(query_title), ''))
+            if query_author:
+                aliases.add((normalize_text(query_title), normalize_text(query_author)))
+
+        for alias_title, alias_author in aliases:
+            existing = self._conn.execute(
+                'SELECT b.ratings_count FROM aliases a JOIN books b ON a.book_id = b.book_id '
+                'WHERE a.title_key = ? AND a.author_key = ?', (alias_title, alias_author)
+            ).fetchone()
+            # A title-only alias points at the most-rated edition seen so far
+            if existing is None or alias_author or (book.get('ratings_count') or 0) >= existing[0]:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO aliases (title_key, author_key, book_id) VALUES (?, ?, ?)',
+                    (alias_title, alias_author, book_id)
+                )
+                if not alias_author and self._title_index is not None:
+                    self._index_title(alias_title, book_id)
+
+    def add(self, book, query_title=None, query_author=None):
+        """
+        Store a book record
+
+        Args:
+            book (dict): Book information in the _extract_book_info shape
+            query_title (str, optional): Title the book was looked up by, stored as an alias
+            query_author (str, optional): Author the book was looked up by
+        """
+        if not book or book.get('placeholder'):
+            return
+
+        with self._lock:
+            self._add(normalize_record(book), query_title, query_author)
+            self._conn.commit()
+
+    def add_many(self, books):
+        """Store many records in a single transaction; returns the number stored"""
+        count = 0
+        with self._lock:
+            for book in books:
+                if book and not book.get('placeholder'):
+                    self._add(normalize_record(book))
+                    count += 1
+            self._conn.commit()
+        return count
+
+    def lookup(self, title, author=None):
+        """
+        Find a book by title and optionally author
+
+        Args:
+            title (str): Book title
+            author (str, optional): Author name
+
+        Returns:
+            dict: Book information or None if the catalog doesn't know the title
+        """
+        title_key = normalize_text(title)
+        author_key = normalize_text(author)
+
+        query = ('SELECT b.data FROM aliases a JOIN books b ON a.book_id = b.book_id '
+                 'WHERE a.title_key = ? AND a.author_key = ?')
+        with self._lock:
+            row = self._conn.execute(query, (title_key, author_key)).fetchone()
+            if row is None and author_key:
+                row = self._conn.execute(query, (title_key, '')).fetchone()
+                # Accept the title-only match when the author's surname agrees
+                if row is not None:
+                    surname = author_key.split()[-1]
+                    authors = normalize_text(json.loads(row[0])['author_string']).split()
+                    if surname not in authors:
+                        row = None
+
+        return json.loads(row[0]) if row else None
+
+    def _index_title(self, title_key, book_id):
+        """Add a title alias to the fuzzy index"""
+        self._title_books[title_key] = book_id
+        self._title_index.add(title_key, title_key)
+
+    def _ensure_title_index(self):
+        """Build the fuzzy title index from the stored aliases; the caller holds the lock"""
+        if self._title_index is None:
+            self._title_index = TrigramIndex()
+            rows = self._conn.execute("SELECT title_key, book_id FROM aliases WHERE author_key = ''")
+            for title_key, book_id in rows:
+                self._index_title(title_key, book_id)
+        return self._title_index
+
+    def fuzzy_search(self, title, author=None, limit=5):
+        """
+        Rank known books by title similarity
+
+        Args:
+            title (str): Title to match, possibly misspelled or abbreviated
+            author (str, optional): Candidates whose authors don't include this surname
+                have their score halved
+            limit (int): Maximum number of candidates
+
+        Returns:
+            list: (score, book) pairs, best first, with scores in [0, 1]
+        """
+        with self._lock:
+            index = self._ensure_title_index()
+            matches = [(score, self._title_books[key]) for score, key in index.search(title, limit)]
+
+        surname = normalize_text(author).split()[-1] if normalize_text(author) else None
+        candidates = []
+        seen = set()
+        for score, book_id in matches:
+            if book_id in seen:
+                continue
+            seen.add(book_id)
+            book = self.get(book_id)
+            if book is None:
+                continue
+            if surname and surname not in normalize_text(book['author_string']).split():
+                score *= 0.5
+            candidates.append((score, book))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return candidates
+
+    def fuzzy_lookup(self, title, author=None, threshold=0.8):
+        """Return the best fuzzy match scoring at least threshold, or None"""
+        candidates = self.fuzzy_search(title, author, limit=3)
+        if candidates and candidates[0][0] >= threshold:
+            return candidates[0][1]
+        return None
+
+    def get(self, book_id):
+        """Return the record stored under a volume ID, or None"""
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM books WHERE book_id = ?', (book_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_books(self):
+        """Yield every stored record"""
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM books').fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM books').fetchone()[0]
+
+    def import_jsonl(self, path):
+        """Bulk import one JSON book record per line; returns the number imported"""
+        with open(path, encoding='utf-8') as f:
+            return self.add_many(json.loads(line) for line in f if line.strip())
+
+    def import_csv(self, path):
+        """Bulk import a CSV with a header row of book field names; returns the number imported"""
+        with open(path, encoding='utf-8', newline='') as f:
+            return self.add_many(csv.DictReader(f))
+
+    def import_file(self, path):
+        """Import a .jsonl or .csv file based on its extension"""
+        if path.lower().endswith('.csv'):
+            return self.import_csv(path)
+        return self.import_jsonl(path)
+
+# Command-line import
+def main(paths):
+    """Import catalog files given on the command line"""
+    catalog = BookCatalog()
+
+    for path in paths:
+        count = catalog.import_file(path)
+        print(f"📚 Imported {count} books from {path}")
+
+    print(f"Catalog now holds {len(catalog)} books ({catalog.path})")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
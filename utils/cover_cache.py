@@ -0,0 +1,108 @@
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from utils.cache import MISSING, create_tiered_cache, get_cache_dir
+from utils.single_flight import SingleFlight
+
+# Google Books volume IDs are short URL-safe strings
+VOLUME_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/gif': '.gif', 'image/webp': '.webp'}
+
+class CoverCache:
+    # Covers rarely change; missing covers are retried sooner
+    INDEX_TTL = 30 * 24 * 3600
+    NEGATIVE_INDEX_TTL = 24 * 3600
+    MAX_COVER_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, books_api, directory=None, prefetch_workers=4):
+        """
+        Content-addressed on-disk cache of cover images
+
+        Each cover is fetched once, stored under the SHA-256 of its bytes, and
+        indexed by volume ID, so editions sharing an image share one file.
+
+        Args:
+            books_api (GoogleBooksAPI): Resolves volume IDs to thumbnail URLs and
+                provides the HTTP session and timeouts
+            directory (str, optional): Image directory; defaults to covers/ in the cache directory
+            prefetch_workers (int): Background downloads run by prefetch
+        """
+        self.books_api = books_api
+        self.directory = directory or os.path.join(get_cache_dir(), 'covers')
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.index = create_tiered_cache(
+            'covers.sqlite3',
+            memory_size=4096,
+            memory_ttl=self.INDEX_TTL,
+            disk_ttl=self.INDEX_TTL,
+            disk_entries=100000
+        )
+        self.single_flight = SingleFlight()
+        self._prefetcher = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='covers')
+
+    def get(self, volume_id):
+        """
+        Return the cached cover for a volume, fetching it on first use
+
+        Returns:
+            tuple: (file path, SHA-256 digest, content type), or None if the volume
+                has no cover or the ID is invalid
+        """
+        if not VOLUME_ID.match(volume_id):
+            return None
+
+        entry = self.index.get('cover:' + volume_id)
+        if entry is MISSING or (entry and not os.path.exists(self._path(entry))):
+            try:
+                entry = self.single_flight.do(volume_id, lambda: self._fetch(volume_id))
+            except Exception as e:
+                print(f"Error fetching cover for '{volume_id}': {e}")
+                return None
+
+        if not entry:
+            return None
+        return self._path(entry), entry['sha256'], entry['content_type']
+
+    def _path(self, entry):
+        """File path of a cover index entry"""
+        return os.path.join(self.directory, entry['sha256'] + EXTENSIONS.get(entry['content_type'], ''))
+
+    def _fetch(self, volume_id):
+        """Download a volume's cover into the store and index it; raises on request errors"""
+        # Failed lookups raise rather than returning None, so they aren't cached as "no cover"
+        book_info = self.books_api.fetch_book_by_id(volume_id)
+        url = book_info.get('thumbnail') if book_info else None
+        if not url:
+            self.index.set('cover:' + volume_id, None, ttl=self.NEGATIVE_INDEX_TTL)
+            return None
+
+        response = self.books_api.session.get(url, timeout=self.books_api.timeout)
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        data = response.content
+        if content_type not in EXTENSIONS or len(data) > self.MAX_COVER_BYTES:
+            self.index.set('cover:' + volume_id, None, ttl=self.NEGATIVE_INDEX_TTL)
+            return None
+
+        entry = {'sha256': hashlib.sha256(data).hexdigest(), 'content_type': content_type}
+        path = self._path(entry)
+        if not os.path.exists(path):
+            # Write then rename, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        self.index.set('cover:' + volume_id, entry, ttl=self.INDEX_TTL)
+        return entry
+
+    def prefetch(self, books):
+        """Download covers for books in the background, skipping ones already cached"""
+        for book in books:
+            volume_id = book.get('google_books_id')
+            if volume_id and book.get('thumbnail') and self.index.get('cover:' + volume_id) is MISSING:
+                self._prefetcher.submit(self.get, volume_id)
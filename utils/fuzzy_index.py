@@ -0,0 +1,57 @@
+import heapq
+import threading
+from collections import defaultdict
+from utils.text import normalize_text
+
+def trigrams(text):
+    """Return the set of character trigrams of normalized, space-padded text"""
+    padded = f"  {normalize_text(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    def __init__(self):
+        """In-memory inverted index over character trigrams for fuzzy string matching"""
+        self._postings = defaultdict(set)
+        self._grams = {}
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, text):
+        """Index text under doc_id, replacing any text previously stored for it"""
+        grams = trigrams(text)
+        with self._lock:
+            for gram in self._grams.get(doc_id, ()):
+                self._postings[gram].discard(doc_id)
+            self._grams[doc_id] = grams
+            for gram in grams:
+                self._postings[gram].add(doc_id)
+
+    def search(self, text, limit=5, min_score=0.0):
+        """
+        Rank indexed documents by trigram similarity to text
+
+        Args:
+            text (str): Query text
+            limit (int): Maximum number of candidates to return
+            min_score (float): Drop candidates scoring below this
+
+        Returns:
+            list: (score, doc_id) pairs, best first; scores are Dice coefficients in [0, 1]
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+
+        shared = defaultdict(int)
+        with self._lock:
+            for gram in grams:
+                for doc_id in self._postings.get(gram, ()):
+                    shared[doc_id] += 1
+            scored = [
+                (2.0 * count / (len(grams) + len(self._grams[doc_id])), doc_id)
+                for doc_id, count in shared.items()
+            ]
+
+        return [(score, doc_id) for score, doc_id in heapq.nlargest(limit, scored) if score >= min_score]
+
+    def __len__(self):
+        return len(self._grams)
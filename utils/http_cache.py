@@ -0,0 +1,74 @@
+import gzip
+from flask import jsonify, request
+from utils.cache import MISSING, LRUCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip is used when brotli isn't installed
+    brotli = None
+
+# Bodies smaller than this aren't worth the compression overhead
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/')
+
+# Compressed bodies of ETagged responses, so each snapshot version is compressed once
+_compressed_bodies = LRUCache(maxsize=64, ttl=24 * 3600)
+
+def snapshot_response(payload, snapshot, max_age=300, stale_while_revalidate=1800):
+    """
+    Build a cacheable JSON response for a snapshot
+
+    The ETag comes from the snapshot version, so a client that already holds the
+    current version gets an empty 304 instead of the payload.
+
+    Args:
+        payload (dict): JSON body
+        snapshot (Snapshot): Snapshot the payload was built from
+        max_age (int): Seconds browsers may reuse the response without asking
+        stale_while_revalidate (int): Further seconds a stale copy may be served
+            while the browser revalidates in the background
+    """
+    response = jsonify(payload)
+    response.set_etag(snapshot.version, weak=True)
+    response.headers['Cache-Control'] = (
+        f'public, max-age={max_age}, stale-while-revalidate={stale_while_revalidate}'
+    )
+    return response.make_conditional(request)
+
+def _preferred_encoding():
+    """Pick brotli or gzip from the request's Accept-Encoding, or None"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """
+    after_request hook compressing sizeable text responses
+
+    Streamed responses (SSE, NDJSON) are left alone so events aren't buffered.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _preferred_encoding()
+    if encoding is None or response.content_length is None or response.content_length < COMPRESS_MIN_SIZE:
+        return response
+
+    etag, _ = response.get_etag()
+    key = f"{request.full_path}|{etag}|{encoding}" if etag else None
+    body = _compressed_bodies.get(key) if key else MISSING
+    if body is MISSING:
+        data = response.get_data()
+        body = brotli.compress(data, quality=5) if encoding == 'br' else gzip.compress(data, compresslevel=6)
+        if key:
+            _compressed_bodies.set(key, body)
+
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
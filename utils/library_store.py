@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from utils.cache import get_cache_dir
+from utils.text import normalize_text
+
+def library_book_id(book):
+    """Key a library entry by volume ID, or by normalized title for books without one"""
+    if book.get('google_books_id'):
+        return book['google_books_id']
+    return f"title:{normalize_text(book.get('title'))}"
+
+def _string_list(value):
+    """Coerce a client-supplied list field to a list of non-empty strings"""
+    # A bare string is one item, or several separated by ';' as in catalog imports
+    if isinstance(value, str):
+        value = value.split(';')
+    elif not isinstance(value, (list, tuple)):
+        return []
+    return [item.strip() for item in value if isinstance(item, str) and item.strip()]
+
+def clean_book(book):
+    """
+    Validate a book sent by a client before saving it
+
+    Returns:
+        dict: A copy with 'authors' and 'categories' as lists of strings, or None
+            if the book has no string title
+    """
+    if not isinstance(book, dict) or not isinstance(book.get('title'), str) or not book['title'].strip():
+        return None
+    book = dict(book)
+    for field in ('authors', 'categories'):
+        if field in book:
+            book[field] = _string_list(book[field])
+    return book
+
+class LibraryStore:
+    def __init__(self, path=None):
+        """
+        Per-user saved books in SQLite, with change versions for delta sync
+
+        Removed books are kept as tombstones so clients syncing from an older
+        version learn about the removal.
+
+        Args:
+            path (str, optional): SQLite file path; defaults to library.sqlite3 in the cache directory
+        """
+        path = path or os.path.join(get_cache_dir(), 'library.sqlite3')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS library (
+                user_id TEXT NOT NULL,
+                book_id TEXT NOT NULL,
+                data TEXT,
+                version INTEGER NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (user_id, book_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_library_version ON library (user_id, version);
+        ''')
+        self._conn.commit()
+
+    def _next_version(self, user_id):
+        """Return the user's next change version; the caller holds the lock"""
+        row = self._conn.execute('SELECT MAX(version) FROM library WHERE user_id = ?', (user_id,)).fetchone()
+        return (row[0] or 0) + 1
+
+    def add_many(self, user_id, books):
+        """
+        Save books to a user's library in one transaction
+
+        Returns:
+            int: The user's library version after the change
+        """
+        now = time.time()
+        books = [book for book in map(clean_book, books) if book]
+        with self._lock:
+            version = self._next_version(user_id)
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO library (user_id, book_id, data, version, deleted, updated_at) '
+                'VALUES (?, ?, ?, ?, 0, ?)',
+                [(user_id, library_book_id(book), json.dumps(book), version, now) for book in books]
+            )
+            self._conn.commit()
+        return version
+
+    def remove_many(self, user_id, book_ids):
+        """
+        Remove books from a user's library in one transaction, leaving tombstones
+
+        Returns:
+            int: The user's library version after the change
+        """
+        now = time.time()
+        with self._lock:
+            version = self._next_version(user_id)
+            self._conn.executemany(
+                'UPDATE library SET data = NULL, deleted = 1, version = ?, updated_at = ? '
+                'WHERE user_id = ? AND book_id = ? AND deleted = 0',
+                [(version, now, user_id, book_id) for book_id in book_ids]
+            )
+            self._conn.commit()
+        return version
+
+    def changes_since(self, user_id, since=0):
+        """
+        Return what changed in a user's library after a version
+
+        Returns:
+            dict: 'books' added or updated, 'removed' book IDs and the current 'version'
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT book_id, data, deleted, version FROM library WHERE user_id = ? AND version > ? '
+                'ORDER BY version', (user_id, since)
+            ).fetchall()
+            version = self._conn.execute(
+                'SELECT MAX(version) FROM library WHERE user_id = ?', (user_id,)
+            ).fetchone()[0] or 0
+
+        return {
+            'books': [json.loads(data) for _, data, deleted, _ in rows if not deleted],
+            'removed': [book_id for book_id, _, deleted, _ in rows if deleted],
+            'version': version
+        }
+
+    def books(self, user_id):
+        """Return every book in a user's library, oldest change first"""
+        return self.changes_since(user_id)['books']
+
+    def profile(self, user_id, limit=3):
+        """
+        Summarize a user's library for personalizing recommendations
+
+        Returns:
+            dict: 'titles' of owned books, plus the most common 'authors' and 'genres'
+        """
+        books = self.books(user_id)
+        # Rows saved before add_many validated its input may still hold malformed fields
+        authors = Counter(author for book in books for author in _string_list(book.get('authors'))
+                          if author != 'Unknown Author')
+        genres = Counter(genre for book in books for genre in _string_list(book.get('categories')))
+        return {
+            'titles': [book['title'] for book in books],
+            'authors': [author for author, _ in authors.most_common(limit)],
+            'genres': [genre for genre, _ in genres.most_common(limit)]
+        }
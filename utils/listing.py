@@ -0,0 +1,54 @@
+# Compact fields for grid cards; rank and badge fields are always kept
+CARD_FIELDS = ('google_books_id', 'title', 'authors', 'author_string', 'thumbnail',
+               'average_rating', 'ratings_count', 'placeholder')
+RANK_FIELDS = ('is_trending', 'trending_rank', 'is_top_rated', 'top_rated_rank', 'recommendation_rank')
+
+MAX_PAGE_SIZE = 100
+
+def parse_list_params(args):
+    """
+    Read limit, offset and fields from query arguments
+
+    fields is a comma-separated list of book fields, or "card" for CARD_FIELDS.
+
+    Returns:
+        tuple: (limit or None, offset, set of fields or None)
+
+    Raises:
+        ValueError: If limit isn't a positive integer or offset a non-negative one
+    """
+    limit = args.get('limit')
+    limit = min(int(limit), MAX_PAGE_SIZE) if limit not in (None, '') else None
+    offset = int(args.get('offset') or 0)
+    # An empty page would hand back next_offset == offset and page forever
+    if (limit is not None and limit < 1) or offset < 0:
+        raise ValueError("limit must be positive and offset must not be negative")
+
+    fields = None
+    if args.get('fields'):
+        fields = set()
+        for field in args['fields'].split(','):
+            field = field.strip()
+            fields.update(CARD_FIELDS if field == 'card' else (field,) if field else ())
+        fields.update(RANK_FIELDS)
+
+    return limit, offset, fields
+
+def list_page(books, limit=None, offset=0, fields=None):
+    """
+    Slice and project a book list into a response body
+
+    Returns:
+        dict: books, total_found, offset and next_offset (None on the last page)
+    """
+    end = len(books) if limit is None else offset + limit
+    page = books[offset:end]
+    if fields is not None:
+        page = [{k: v for k, v in book.items() if k in fields} for book in page]
+
+    return {
+        'books': page,
+        'total_found': len(books),
+        'offset': offset,
+        'next_offset': end if page and end < len(books) else None
+    }
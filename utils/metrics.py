@@ -0,0 +1,207 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from cache-speed lookups to slow model calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+def _format_labels(names, values, extra=()):
+    """Render a Prometheus label set"""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        """Monotonic counter, optionally split by labels"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """Add amount to the series selected by labels"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        """Yield exposition lines"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Distribution of observed values over fixed buckets, optionally split by labels"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: [count per bucket (last is +Inf), sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one observation"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, including when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self):
+        """Yield exposition lines"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+class Registry:
+    def __init__(self):
+        """Metrics exported together at /metrics"""
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        """Create and register a Counter"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Create and register a Histogram"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        Add a callable run at scrape time
+
+        It returns (name, type, documentation, [(labels dict, value), ...]) tuples,
+        which lets existing counters such as cache stats be exported without
+        instrumenting their hot paths.
+        """
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    'bookai_llm_request_seconds', 'Latency of Gemini model calls', ['prompt_type'])
+LLM_OUTCOMES = REGISTRY.counter(
+    'bookai_llm_outcomes_total', 'Model answers by outcome (ok, error, timeout, hedged)', ['prompt_type', 'outcome'])
+BOOKS_REQUEST_SECONDS = REGISTRY.histogram(
+    'bookai_books_request_seconds', 'Latency of Google Books HTTP requests, per attempt', ['status'])
+BOOK_LOOKUPS = REGISTRY.counter(
+    'bookai_book_lookups_total', 'Title lookups by result (found, placeholder)', ['result'])
+FALLBACK_SEARCHES = REGISTRY.counter(
+    'bookai_fallback_searches_total', 'Broader searches run after an exact title search missed')
+RECOMMENDATION_SECONDS = REGISTRY.histogram(
+    'bookai_recommendation_seconds', 'End-to-end recommendation pipeline time', ['mode'])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    'bookai_http_request_seconds', 'Flask request handling time', ['endpoint', 'method', 'status'])
+ERRORS = REGISTRY.counter(
+    'bookai_errors_total', 'Errors handled without failing the caller', ['component'])
+
+def cache_collector(caches):
+    """
+    Build a scrape-time collector for cache statistics
+
+    Args:
+        caches (dict): Name -> cache object with a stats() method (tiered caches
+            report one series per tier)
+    """
+    def collect():
+        hits, misses = [], []
+        for name, cache in caches.items():
+            stats = cache.stats()
+            tiers = stats.items() if all(isinstance(v, dict) for v in stats.values()) else [('', stats)]
+            for tier, tier_stats in tiers:
+                labels = {'cache': name, 'tier': tier} if tier else {'cache': name}
+                if 'hits' in tier_stats:
+                    hits.append((labels, tier_stats['hits']))
+                    misses.append((labels, tier_stats['misses']))
+        return [
+            ('bookai_cache_hits_total', 'counter', 'Cache hits', hits),
+            ('bookai_cache_misses_total', 'counter', 'Cache misses', misses)
+        ]
+    return collect
+
+def single_flight_collector(groups):
+    """
+    Build a scrape-time collector for single-flight statistics
+
+    Args:
+        groups (dict): Name -> SingleFlight or AsyncSingleFlight
+    """
+    def collect():
+        calls, collapsed, in_flight = [], [], []
+        for name, group in groups.items():
+            stats = group.stats()
+            labels = {'group': name}
+            calls.append((labels, stats['calls']))
+            collapsed.append((labels, stats['collapsed']))
+            in_flight.append((labels, stats['in_flight']))
+        return [
+            ('bookai_single_flight_calls_total', 'counter', 'Calls run upstream by a single-flight group', calls),
+            ('bookai_single_flight_collapsed_total', 'counter',
+             'Duplicate calls that waited on an in-flight call instead', collapsed),
+            ('bookai_single_flight_in_flight', 'gauge', 'Calls currently in flight', in_flight)
+        ]
+    return collect
@@ -0,0 +1,157 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from utils.text import normalize_text
+
+# Modulus for the MinHash permutations; keeps a * x + b within int64
+_PRIME = (1 << 31) - 1
+
+def canonicalize_preferences(preferences):
+    """
+    Return a copy of preferences with genres, favorite books, favorite authors and
+    owned books lowercased, trimmed, deduplicated and sorted
+
+    Equivalent preference sets ("Mystery, Thriller" and "thriller, mystery ") then
+    produce identical prompts and cache keys. Other fields are passed through.
+    """
+    canonical = dict(preferences)
+    for field in ('genres', 'favorite_books', 'favorite_authors', 'owned_books'):
+        if field not in preferences:
+            continue
+        values = (' '.join(str(value).split()).lower() for value in preferences.get(field) or [])
+        canonical[field] = sorted({value for value in values if value})
+    return canonical
+
+def preference_features(preferences):
+    """Return the feature set compared between preference sets"""
+    features = set()
+    for prefix, field in (('g', 'genres'), ('b', 'favorite_books'), ('a', 'favorite_authors')):
+        for value in preferences.get(field) or []:
+            key = normalize_text(str(value))
+            if key:
+                features.add(f"{prefix}:{key}")
+    return frozenset(features)
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class PreferenceCache:
+    def __init__(self, threshold=0.8, maxsize=2048, ttl=3600, num_perm=64, bands=16):
+        """
+        Serve results computed for a similar preference set
+
+        Candidates are found through a MinHash LSH index over preference features
+        and then verified by exact Jaccard similarity.
+
+        Args:
+            threshold (float): Minimum Jaccard similarity for a hit
+            maxsize (int): Maximum number of stored preference sets
+            ttl (float): Lifetime of stored results in seconds
+            num_perm (int): Number of MinHash permutations
+            bands (int): LSH bands; must divide num_perm evenly
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = np.random.default_rng(0x5EED)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _band_keys(self, features):
+        """Hash a feature set's MinHash signature into one bucket key per band"""
+        hashes = np.array([int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'big') % _PRIME
+                           for f in features], dtype=np.int64)
+        signature = ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)]
+
+    def get(self, preferences, count, threshold=None):
+        """
+        Return the result stored for the most similar preference set, or None
+
+        Args:
+            preferences (dict): User preferences
+            count (int): Number of results the caller needs; only results stored
+                for the same count are served
+            threshold (float, optional): Override the similarity threshold
+        """
+        features = preference_features(preferences)
+        if not features:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+
+        band_keys = self._band_keys(features)
+        now = time.time()
+        best = None
+        with self._lock:
+            entry = self._entries.get((features, count))
+            if entry is not None and entry[2] > now:
+                best = (1.0, (features, count))
+            else:
+                candidates = set()
+                for band_key in band_keys:
+                    candidates.update(self._buckets.get(band_key, ()))
+                for key in candidates:
+                    other_features, other_count = key
+                    if other_count != count or self._entries[key][2] <= now:
+                        continue
+                    score = jaccard(features, other_features)
+                    if score >= threshold and (best is None or score > best[0]):
+                        best = (score, key)
+
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[1])
+            return self._entries[best[1]][0]
+
+    def set(self, preferences, count, value):
+        """Store a result for a preference set"""
+        features = preference_features(preferences)
+        if not features or not value:
+            return
+
+        key = (features, count)
+        band_keys = self._band_keys(features)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, band_keys, time.time() + self.ttl)
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        """Drop an entry and its bucket memberships; the caller holds the lock"""
+        _, band_keys, _ = self._entries.pop(key)
+        for band_key in band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored preference sets"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries)
+            }
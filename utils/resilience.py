@@ -0,0 +1,128 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+def parse_retry_after(value):
+    """Return the delay in seconds from a Retry-After header (seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    # Responses worth retrying: throttling and server-side failures
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_retries=2, backoff=0.5, max_backoff=8.0):
+        """
+        Jittered exponential backoff for transient upstream failures
+
+        Args:
+            max_retries (int): Retries after the first attempt
+            backoff (float): Base delay in seconds, doubled on each retry
+            max_backoff (float): Longest delay to wait; a Retry-After beyond this
+                gives up instead of pinning the caller
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Seconds to wait before retry number attempt (0-based), or None to give up
+
+        Args:
+            attempt (int): Number of retries already made
+            retry_after (str, optional): Retry-After header from the failed response
+        """
+        if attempt >= self.max_retries:
+            return None
+
+        requested = parse_retry_after(retry_after)
+        if requested is not None:
+            return requested if requested <= self.max_backoff else None
+
+        # Full jitter keeps clients that failed together from retrying together
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        """
+        Stop calling an upstream after repeated failures
+
+        After failure_threshold consecutive failures the circuit opens and allow()
+        returns False, so callers fall back to cache or placeholders at once. After
+        reset_timeout seconds a single probe request is let through; its outcome
+        closes the circuit or opens it again. A probe that never reports back is
+        replaced by a new one after another reset_timeout.
+
+        Args:
+            name (str): Upstream name, used in status reports
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds to stay open before probing
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be sent now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                # opened_at then marks when the probe went out
+                self.state = 'half_open'
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful request"""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        """Count a failed request, opening the circuit at the threshold or after a failed probe"""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """
+        End a request that failed locally without learning anything about the upstream
+
+        Nothing is counted; a half-open probe is given back, so the next request probes.
+        """
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def status(self):
+        """Summarize the breaker state for health checks"""
+        with self._lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'consecutive_failures': self.failures
+            }
@@ -0,0 +1,147 @@
+import re
+import numpy as np
+
+class PreferenceScorer:
+    def __init__(self, preferences):
+        """
+        Score candidate books against one user's preferences
+
+        Preference features are prepared once, so a whole candidate list can be
+        scored in a single pass.
+
+        Args:
+            preferences (dict): Contains 'genres' and optionally 'favorite_authors'
+        """
+        self.genres = [g.lower() for g in preferences.get('genres', [])]
+        self.has_favorite_authors = bool(preferences.get('favorite_authors', []))
+        unique_genres = sorted(set(self.genres), key=len, reverse=True)
+        # Cheap pre-check that rejects books sharing no genre before the per-genre scan
+        self._genre_pattern = re.compile('|'.join(map(re.escape, unique_genres))) if unique_genres else None
+
+    def genre_matches(self, book_data):
+        """Return the user's genres (in their order) that appear in the book's categories"""
+        if self._genre_pattern is None or not book_data.get('categories'):
+            return []
+
+        # Newlines can't occur in a genre, so a substring of the joined text lies within one category
+        categories = '\n'.join(book_data.get('categories') or []).lower()
+        if not self._genre_pattern.search(categories):
+            return []
+        return [genre for genre in self.genres if genre in categories]
+
+    def relevance_scores(self, books, genre_counts=None):
+        """
+        Calculate relevance scores (0-100) for many books at once
+
+        Args:
+            books (list): Book information dictionaries
+            genre_counts (list, optional): Precomputed genre match counts per book
+
+        Returns:
+            list: One score per book
+        """
+        if not books:
+            return []
+
+        if genre_counts is None:
+            genre_counts = [len(self.genre_matches(book)) for book in books]
+
+        ratings = np.array([book.get('average_rating') or 0 for book in books], dtype=float)
+        counts = np.array([book.get('ratings_count') or 0 for book in books], dtype=float)
+        has_rating = ratings != 0
+
+        scores = 50 + np.asarray(genre_counts, dtype=float) * 10  # Base score plus genre matching
+        scores += np.where(has_rating, (ratings - 3) * 5, 0)  # Bonus for ratings above 3
+        scores += (counts > 1000) * 5.0 + (counts > 10000) * 5.0  # Popularity bonus
+        # Keep the per-book result types: floats only when a float rating contributed
+        # and the score wasn't clamped to the 0-100 bounds
+        float_scores = (np.array([isinstance(book.get('average_rating') or 0, float) for book in books])
+                        & (scores > 0) & (scores < 100))
+        scores = np.clip(scores, 0, 100)
+
+        return [float(score) if is_float else int(score)
+                for score, is_float in zip(scores.tolist(), float_scores.tolist())]
+
+    def relevance_score(self, book_data, genre_count=None):
+        """
+        Calculate the relevance score (0-100) of one book
+
+        Plain-Python equivalent of relevance_scores for books scored as they
+        arrive, without building arrays for a single row.
+        """
+        if genre_count is None:
+            genre_count = len(self.genre_matches(book_data))
+
+        rating = book_data.get('average_rating') or 0
+        ratings_count = book_data.get('ratings_count') or 0
+
+        score = 50 + genre_count * 10  # Base score plus genre matching
+        if rating:
+            score += (rating - 3) * 5  # Bonus for ratings above 3
+        score += (ratings_count > 1000) * 5 + (ratings_count > 10000) * 5  # Popularity bonus
+        if isinstance(rating, float) and 0 < score < 100:
+            return float(score)
+        return int(min(max(score, 0), 100))
+
+    def explanation(self, book_data, genre_matches=None):
+        """Generate an explanation for why this book was recommended"""
+        if genre_matches is None:
+            genre_matches = self.genre_matches(book_data)
+
+        reasons = []
+        if genre_matches:
+            reasons.append(f"matches your interest in {', '.join(genre_matches)}")
+
+        if self.has_favorite_authors:
+            reasons.append("has a writing style similar to your favorite authors")
+
+        rating = book_data.get('average_rating')
+        if rating and rating >= 4.0:
+            reasons.append(f"has excellent ratings ({rating}/5)")
+
+        if not reasons:
+            reasons.append("matches your reading preferences based on AI analysis")
+
+        return f"Recommended because it {' and '.join(reasons)}."
+
+    def match_reasons(self, book_data, genre_matches=None):
+        """Get up to three specific reasons why this book matches user preferences"""
+        if genre_matches is None:
+            genre_matches = self.genre_matches(book_data)
+
+        reasons = [f"Genre: {genre.title()}" for genre in genre_matches]
+
+        rating = book_data.get('average_rating')
+        if rating and rating >= 4.0:
+            reasons.append(f"Highly Rated: {rating}⭐")
+
+        ratings_count = book_data.get('ratings_count')
+        if ratings_count and ratings_count > 5000:
+            reasons.append("Popular Choice")
+
+        return reasons[:3]
+
+    def score_batch(self, books):
+        """
+        Score a candidate list in one pass
+
+        Returns:
+            list: (relevance_score, explanation, match_reasons) per book
+        """
+        matches = [self.genre_matches(book) for book in books]
+        scores = self.relevance_scores(books, [len(m) for m in matches])
+        return [
+            (score, self.explanation(book, m), self.match_reasons(book, m))
+            for book, m, score in zip(books, matches, scores)
+        ]
+
+    def score(self, book_data):
+        """
+        Score one book, for callers that rank books as their lookups complete
+
+        Returns:
+            tuple: (relevance_score, explanation, match_reasons), as from score_batch
+        """
+        matches = self.genre_matches(book_data)
+        return (self.relevance_score(book_data, len(matches)),
+                self.explanation(book_data, matches), self.match_reasons(book_data, matches))
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+
+class _Call:
+    """An in-flight call that duplicate callers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SharedStream:
+    """Items published by one producer, replayed from the start to every reader"""
+
+    def __init__(self):
+        self._items = []
+        self._done = False
+        self._error = None
+        self._changed = threading.Condition()
+
+    def _publish(self, item):
+        with self._changed:
+            self._items.append(item)
+            self._changed.notify_all()
+
+    def _finish(self, error=None):
+        with self._changed:
+            self._done = True
+            self._error = error
+            self._changed.notify_all()
+
+    def read(self, deadline=None):
+        """
+        Yield every item, waiting for new ones until the producer finishes
+
+        Args:
+            deadline (float, optional): time.monotonic() value after which waiting stops
+
+        Raises:
+            TimeoutError: If the deadline passed before the producer finished
+            The producer's exception, once all items before it were yielded
+        """
+        index = 0
+        while True:
+            with self._changed:
+                while index >= len(self._items) and not self._done:
+                    timeout = deadline - time.monotonic() if deadline is not None else None
+                    if timeout is not None and timeout <= 0:
+                        raise TimeoutError("Stream did not finish before the deadline")
+                    self._changed.wait(timeout)
+                items = self._items[index:]
+                done, error = self._done, self._error
+            index += len(items)
+            # Yield outside the lock so a slow reader doesn't hold up the producer
+            yield from items
+            if done and not items:
+                if error is not None:
+                    raise error
+                return
+
+class SingleFlight:
+    def __init__(self):
+        """Collapse concurrent calls with the same key into one upstream call"""
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key (hashable): Identifies identical work
+            fn (callable): Zero-argument function performing the work
+
+        Returns:
+            The result of fn; exceptions are re-raised in every waiting caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.collapsed += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def stream(self, key, fn, executor):
+        """
+        Run a streaming call once for all concurrent callers with the same key
+
+        The first caller submits fn to executor, so the call completes even if
+        every reader gives up; later callers join it and replay what was already
+        published.
+
+        Args:
+            key (hashable): Identifies identical work
+            fn (callable): Called with a publish(item) callback; returns when the
+                stream ends and raises if it failed
+            executor (Executor): Runs fn
+
+        Returns:
+            SharedStream: Iterate over read() for the items
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is not None:
+                self.collapsed += 1
+                return shared
+            shared = SharedStream()
+            self._streams[key] = shared
+            self.calls += 1
+
+        def produce():
+            error = None
+            try:
+                fn(shared._publish)
+            except BaseException as e:
+                error = e
+            finally:
+                with self._lock:
+                    del self._streams[key]
+                shared._finish(error)
+
+        try:
+            executor.submit(produce)
+        except BaseException as e:
+            with self._lock:
+                del self._streams[key]
+            shared._finish(e)
+        return shared
+
+    def stats(self):
+        """Return how many calls ran upstream and how many were collapsed onto them"""
+        with self._lock:
+            in_flight = len(self._calls) + len(self._streams)
+        return {
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'in_flight': in_flight
+        }
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """Collapse concurrent coroutines with the same key into one awaited call"""
+        self._calls = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn):
+        """
+        Await fn() once for all concurrent callers with the same key
+
+        Args:
+            key (hashable): Identifies identical work
+            fn (callable): Zero-argument function returning an awaitable
+
+        Returns:
+            The awaited result of fn; exceptions are re-raised in every waiting caller
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            self.collapsed += 1
+            # Shield so one cancelled waiter doesn't cancel the shared call
+            return await asyncio.shield(future)
+
+        self.calls += 1
+        future = asyncio.ensure_future(fn())
+        self._calls[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if future.done():
+                self._calls.pop(key, None)
+            else:
+                future.add_done_callback(lambda _: self._calls.pop(key, None))
+
+    def stats(self):
+        """Return how many calls ran upstream and how many were collapsed onto them"""
+        return {
+            'calls': self.calls,
+            'collapsed': self.collapsed,
+            'in_flight': len(self._calls)
+        }
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+
+Snapshot = namedtuple('Snapshot', ['data', 'version', 'built_at'])
+
+class DegradedSnapshotError(Exception):
+    def __init__(self, message, data):
+        """
+        Raised by a builder whose result is servable but worse than a normal build,
+        e.g. made of fallback titles or placeholders while an upstream is down
+
+        Args:
+            message (str): Why the result is degraded
+            data: The degraded result, served only while no good snapshot exists
+        """
+        super().__init__(message)
+        self.data = data
+
+class SnapshotRefresher:
+    def __init__(self, name, builder, interval=1800, retry_interval=60, stale_after=None):
+        """
+        Keep a periodically rebuilt snapshot of an expensive result
+
+        Args:
+            name (str): Label used in log messages
+            builder (callable): Zero-argument function returning JSON-serializable data
+            interval (float): Seconds between scheduled rebuilds
+            retry_interval (float): Seconds to wait before retrying a failed rebuild, both
+                on schedule and when reads find the snapshot stale or missing
+            stale_after (float, optional): Age after which a read triggers a background
+                rebuild (defaults to interval)
+        """
+        self.name = name
+        self.builder = builder
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.stale_after = stale_after if stale_after is not None else interval
+        self._snapshot = None
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # time.monotonic() of the last failed or degraded rebuild, None after a success
+        self._failed_at = None
+        self.last_error = None
+
+    def start(self):
+        """Warm up in the background and keep rebuilding on schedule"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the scheduled rebuilds"""
+        self._stop.set()
+
+    def _run(self):
+        """Scheduler loop: rebuild now, then every interval (sooner after a failure)"""
+        while not self._stop.is_set():
+            succeeded = self.refresh()
+            self._stop.wait(self.interval if succeeded else self.retry_interval)
+
+    def refresh(self):
+        """
+        Rebuild the snapshot and swap it in atomically
+
+        Returns:
+            bool: True if a new snapshot was installed; on failure the last good snapshot is kept
+        """
+        with self._refresh_lock:
+            try:
+                data = self.builder()
+            except DegradedSnapshotError as e:
+                print(f"Refreshing {self.name} snapshot degraded: {e}")
+                # A degraded list beats an error page, but never replaces a good one
+                if self._snapshot is None:
+                    self._install(e.data)
+                self.last_error = str(e)
+                self._failed_at = time.monotonic()
+                return False
+            except Exception as e:
+                self.last_error = str(e)
+                self._failed_at = time.monotonic()
+                print(f"Refreshing {self.name} snapshot failed: {e}")
+                return False
+
+            self._install(data)
+            self.last_error = None
+            self._failed_at = None
+            return True
+
+    def _install(self, data):
+        """Version data and swap it in as the current snapshot"""
+        payload = json.dumps(data, sort_keys=True, default=str).encode('utf-8')
+        version = hashlib.sha1(payload).hexdigest()[:16]
+        # Rebinding a single attribute is atomic, readers see the old or new snapshot
+        self._snapshot = Snapshot(data, version, time.time())
+
+    def _retry_due(self):
+        """Return False while the last failed rebuild is more recent than retry_interval"""
+        failed_at = self._failed_at
+        return failed_at is None or time.monotonic() - failed_at >= self.retry_interval
+
+    def _refresh_in_background(self):
+        """Start a rebuild unless one is already running or the last one failed too recently"""
+        if self._refresh_lock.locked() or not self._retry_due():
+            return
+        threading.Thread(target=self.refresh, name=f"{self.name}-revalidate", daemon=True).start()
+
+    def get(self):
+        """
+        Return the latest snapshot, building it synchronously only if none exists yet
+
+        Stale snapshots are served immediately while a rebuild runs in the background.
+        After a failed rebuild, reads don't start another one until retry_interval
+        has passed, so a failing upstream isn't hit on every page view.
+
+        Returns:
+            Snapshot: Latest snapshot, or None if no build has ever succeeded
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Wait for an in-progress warm-up rather than starting a duplicate build
+            with self._refresh_lock:
+                snapshot = self._snapshot
+            if snapshot is None and self._retry_due():
+                self.refresh()
+                snapshot = self._snapshot
+        elif time.time() - snapshot.built_at > self.stale_after:
+            self._refresh_in_background()
+        return snapshot
+
+    def status(self):
+        """Return snapshot age and version for monitoring"""
+        snapshot = self._snapshot
+        return {
+            'name': self.name,
+            'version': snapshot.version if snapshot else None,
+            'age_seconds': round(time.time() - snapshot.built_at, 1) if snapshot else None,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_ISBN_SEPARATORS = re.compile(r'[\s-]')
+_ISBN = re.compile(r'^(?:\d{9}[\dX]|\d{13})$')
+
+def normalize_text(text):
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+def make_book_key(title, author=None):
+    """Build a stable lookup key from a title and optional author"""
+    return f"{normalize_text(title)}|{normalize_text(author)}"
+
+def normalize_isbn(isbn):
+    """Strip separators from an ISBN-10 or ISBN-13, returning None if it isn't one"""
+    if not isbn:
+        return None
+    isbn = _ISBN_SEPARATORS.sub('', str(isbn)).upper()
+    return isbn if _ISBN.match(isbn) else None
@@ -0,0 +1,198 @@
+import contextvars
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from utils.cache import get_cache_dir
+
+# Client-supplied trace IDs are echoed in headers and logs, so keep them plain
+TRACE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# (active trace, ID of the innermost open span) for the current thread or task
+_current = contextvars.ContextVar('bookai_trace', default=None)
+
+class Trace:
+    def __init__(self, name, trace_id=None):
+        """
+        Timeline of the spans recorded while handling one request
+
+        Args:
+            name (str): What is being traced, e.g. the route
+            trace_id (str, optional): ID to propagate from the caller; a random one
+                is used if missing or malformed
+        """
+        self.trace_id = trace_id if trace_id and TRACE_ID.match(trace_id) else uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.duration = None
+        self._start = time.perf_counter()
+        self._spans = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def elapsed(self):
+        """Seconds since the trace started"""
+        return time.perf_counter() - self._start
+
+    def _add(self, span):
+        with self._lock:
+            # Work still running after the request finished, like a losing hedged call, is dropped
+            if self.duration is None:
+                self._spans.append(span)
+
+    def activate(self):
+        """
+        Make this the current trace for the calling context
+
+        Returns:
+            contextvars.Token: Pass to deactivate when the traced work is done
+        """
+        return _current.set((self, None))
+
+    def finish(self):
+        """Stop the clock; spans ending later are ignored"""
+        with self._lock:
+            if self.duration is None:
+                self.duration = self.elapsed()
+
+    def timeline(self):
+        """
+        Return the trace as a JSON-serializable dict
+
+        'stages' totals the time and count per span name; 'spans' lists every
+        span in start order, with offsets in milliseconds from the trace start.
+        """
+        with self._lock:
+            spans = sorted(self._spans, key=lambda span: span['start_ms'])
+        duration = self.duration if self.duration is not None else self.elapsed()
+
+        stages = {}
+        for span in spans:
+            stage = stages.setdefault(span['name'], {'count': 0, 'total_ms': 0.0})
+            stage['count'] += 1
+            stage['total_ms'] = round(stage['total_ms'] + span['duration_ms'], 3)
+
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(duration * 1000, 3),
+            'stages': stages,
+            'spans': spans
+        }
+
+def deactivate(token):
+    """Restore the trace that was current before Trace.activate"""
+    _current.reset(token)
+
+def current_trace():
+    """Return the active Trace, or None outside a traced request"""
+    current = _current.get()
+    return current[0] if current else None
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time the with-block as a span of the active trace
+
+    Outside a trace this does nothing. The block receives the span's attribute
+    dict, so it can record what it found (cache hits, status codes, counts).
+    Exceptions are recorded by type and re-raised.
+
+    Spans must not be held open across a yield in a generator, since the
+    consumer would then run inside them.
+    """
+    current = _current.get()
+    if current is None:
+        yield attributes
+        return
+
+    trace, parent = current
+    span_id = next(trace._ids)
+    token = _current.set((trace, span_id))
+    start = trace.elapsed()
+    try:
+        yield attributes
+    except BaseException as e:
+        attributes['error'] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        end = trace.elapsed()
+        record = {
+            'id': span_id,
+            'parent': parent,
+            'name': name,
+            'start_ms': round(start * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3),
+            'thread': threading.current_thread().name
+        }
+        if attributes:
+            record['attributes'] = attributes
+        trace._add(record)
+
+def propagate(fn):
+    """
+    Wrap fn so it runs inside the caller's trace and span, wherever it is called
+
+    Thread pools don't carry context variables over to their workers, so
+    callables submitted to an executor are wrapped with this. asyncio tasks
+    copy the context themselves and need no wrapping.
+    """
+    current = _current.get()
+    if current is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _current.set(current)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+class JSONLSink:
+    def __init__(self, path, max_bytes=10 * 1024 * 1024):
+        """
+        Append finished traces to a JSON Lines file for offline analysis
+
+        Args:
+            path (str): File to append to
+            max_bytes (int): Size at which the file is rotated to path + '.1'
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def write(self, trace):
+        """Append one finished trace"""
+        line = json.dumps(trace.timeline(), default=str) + '\n'
+        with self._lock:
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+            except FileNotFoundError:
+                pass
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+def default_sink():
+    """
+    Build the trace sink configured by BOOKAI_TRACE_LOG
+
+    Unset means traces.jsonl in the cache directory; an empty value, "0" or
+    "off" disables the sink.
+    """
+    path = os.getenv('BOOKAI_TRACE_LOG')
+    if path is None:
+        path = os.path.join(get_cache_dir(), 'traces.jsonl')
+    if path.strip().lower() in ('', '0', 'off', 'false'):
+        return None
+    return JSONLSink(path)